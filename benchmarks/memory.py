@@ -0,0 +1,73 @@
+import gc
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from otlpy.base.account import Buy, Order
+from otlpy.base.market import ORDER_TYPE, PQN, Price
+
+N = 1000000
+TICKERS = ["%06d" % i for i in range(2000)]
+
+
+def quotes(n: int) -> list[Price]:
+    return [
+        Price(
+            "090000",
+            # build a fresh string as a decoder would
+            "".join(TICKERS[i % len(TICKERS)]),
+            PQN(71900, 1),
+            PQN(71900, 100),
+            PQN(72000, 100),
+        )
+        for i in range(n)
+    ]
+
+
+def orders(n: int) -> list[Order]:
+    out: list[Order] = []
+    for i in range(n):
+        order = Buy(
+            ORDER_TYPE.LIMIT, "".join(TICKERS[i % len(TICKERS)]), 10, 71900
+        )
+        order.rdata = {
+            "KRX_FWDG_ORD_ORGNO": "91252",
+            "ODNO": "%010d" % i,
+            "ORD_TMD": "090000",
+        }
+        order.uid = order.rdata["ODNO"]
+        order.orgno = order.rdata["KRX_FWDG_ORD_ORGNO"]
+        out.append(order)
+    return out
+
+
+def compact_orders(n: int) -> list[Order]:
+    out = orders(n)
+    for order in out:
+        order.compact()
+    return out
+
+
+def bench(name: str, fn: Callable[[int], list[Any]]) -> None:
+    gc.collect()
+    tracemalloc.start()
+    t = time.perf_counter()
+    objs = fn(N)
+    elapsed = time.perf_counter() - t
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        "%-16s %8.1f MB %6.1f B/obj %6.2f s"
+        % (name, size / 1e6, size / len(objs), elapsed)
+    )
+    del objs
+
+
+def main() -> None:
+    bench("quotes", quotes)
+    bench("orders", orders)
+    bench("orders compact", compact_orders)
+
+
+if __name__ == "__main__":
+    main()
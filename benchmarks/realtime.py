@@ -0,0 +1,66 @@
+import time
+from typing import Callable
+
+from otlpy.kis import realtime
+from otlpy.kis.mock import frame, orderbook_record, trade_record
+
+
+def trade_frames(n: int, count: int) -> list[str]:
+    return [
+        frame(
+            realtime.TR_ID_TRADE,
+            [trade_record("005930", i * count + j) for j in range(count)],
+        )
+        for i in range(n)
+    ]
+
+
+def orderbook_frames(n: int, count: int) -> list[str]:
+    return [
+        frame(
+            realtime.TR_ID_ORDERBOOK,
+            [orderbook_record("005930", i * count + j) for j in range(count)],
+        )
+        for i in range(n)
+    ]
+
+
+def objects(frames: list[str]) -> int:
+    n = 0
+    for f in frames:
+        for _ in realtime.decode(f):
+            n += 1
+    return n
+
+
+def columns(frames: list[str]) -> int:
+    n = 0
+    for i in range(0, len(frames), 256):
+        for c in realtime.decode_columns(frames[i : i + 256]).values():
+            n += len(c["ticker"])
+    return n
+
+
+def bench(
+    name: str, fn: Callable[[list[str]], int], frames: list[str]
+) -> float:
+    t = time.perf_counter()
+    n = fn(frames)
+    elapsed = time.perf_counter() - t
+    rate = n / elapsed
+    print("%-28s %12.0f msg/s" % (name, rate))
+    return rate
+
+
+def main() -> None:
+    for count in (1, 4):
+        trades = trade_frames(20000, count)
+        orderbooks = orderbook_frames(20000, count)
+        bench("trade objects x%d" % count, objects, trades)
+        bench("trade columns/256 x%d" % count, columns, trades)
+        bench("orderbook objects x%d" % count, objects, orderbooks)
+        bench("orderbook columns/256 x%d" % count, columns, orderbooks)
+
+
+if __name__ == "__main__":
+    main()
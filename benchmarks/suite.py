@@ -0,0 +1,268 @@
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import typer
+import uvicorn
+
+from otlpy.base import net
+from otlpy.base.account import Book, Buy, Inventory
+from otlpy.base.crypto import (
+    AESCBCBase64Decryptor,
+    aes_cbc_base64_dec,
+    aes_cbc_base64_enc,
+)
+from otlpy.base.market import ORDER_TYPE
+from otlpy.kis.kis import KIS
+from otlpy.kis.mock import URL_LIMITORDERBOOK, MockConfig, MockServer
+from otlpy.kis.settings import Settings
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+PORT = 18765
+ORDERS = 10000
+
+Samples = list[float]
+
+
+def settings() -> Settings:
+    return Settings(
+        kis_app_key="bench",
+        kis_app_secret="bench",
+        kis_account_htsid="bench",
+        kis_account_custtype="P",
+        kis_account_cano_domestic_stock="00000000",
+        kis_account_prdt_domestic_stock="01",
+        kis_account_cano_domestic_futureoption=None,
+        kis_account_prdt_domestic_futureoption=None,
+        kis_account_cano_overseas_stock=None,
+        kis_account_prdt_overseas_stock=None,
+    )
+
+
+def serve(port: int) -> uvicorn.Server:
+    config = uvicorn.Config(
+        MockServer(MockConfig(orders=ORDERS)).app,
+        port=port,
+        log_level="warning",
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def batched(fn: Callable[[], Any], batch: int, n: int) -> Samples:
+    samples = []
+    for _ in range(n):
+        t = time.perf_counter()
+        for _ in range(batch):
+            fn()
+        samples.append((time.perf_counter() - t) / batch)
+    return samples
+
+
+async def timed(fn: Callable[[], Any], n: int) -> Samples:
+    samples = []
+    for _ in range(n):
+        t = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - t)
+    return samples
+
+
+async def http(port: int) -> dict[str, Samples]:
+    kis = KIS(settings())
+    kis.common.url_base = "http://127.0.0.1:%d" % port
+    ds = kis.domestic_stock
+    async with net.http_client(kis.common.url_base, 10) as client:
+        await kis.common.token(client, 0, False)
+        headers = kis.common.headers4()
+        data = {"FID_COND_MRKT_DIV_CODE": "J", "FID_INPUT_ISCD": "005930"}
+        hashkey = {"PDNO": "005930"}
+        return {
+            "net.get": await timed(
+                lambda: net.get(
+                    client, URL_LIMITORDERBOOK, headers, data, 0, False
+                ),
+                500,
+            ),
+            "net.post": await timed(
+                lambda: net.post(
+                    client, "/uapi/hashkey", headers, hashkey, 0, False
+                ),
+                500,
+            ),
+            "all_orders 10k": await timed(
+                lambda: ds.all_orders(client, "20260101", 0, False), 5
+            ),
+            "new_order": await timed(
+                lambda: ds.buy_limit(client, "005930", 1, 70000, 0, False),
+                500,
+            ),
+        }
+
+
+def aes() -> dict[str, Samples]:
+    key = "0123456789abcdef0123456789abcdef"
+    iv = "abcdef0123456789"
+    cipher_text = aes_cbc_base64_enc(key, iv, "^".join(["0000117057"] * 23))
+    decryptor = AESCBCBase64Decryptor(key, iv)
+    return {
+        "aes_cbc_base64_dec": batched(
+            lambda: aes_cbc_base64_dec(key, iv, cipher_text), 1000, 50
+        ),
+        "AESCBCBase64Decryptor": batched(
+            lambda: decryptor.decrypt(cipher_text), 1000, 50
+        ),
+    }
+
+
+def templates() -> dict[str, Samples]:
+    kis = KIS(settings())
+    kis.common.authorization = "Bearer bench"
+    ds = kis.domestic_stock
+    order = Buy(ORDER_TYPE.LIMIT, "005930", 10, 70000)
+
+    def build() -> bytes:
+        # what every order paid before the templates
+        headers = {**kis.common.headers4(), "tr_id": "TTTC0802U"}
+        data = {
+            "CANO": ds.settings.kis_account_cano_domestic_stock,
+            "ACNT_PRDT_CD": ds.settings.kis_account_prdt_domestic_stock,
+            "PDNO": order.ticker,
+            "ORD_DVSN": ds.order_type(order.otype),
+            "ORD_QTY": str(int(order.qty)),
+            "ORD_UNPR": str(int(order.price)),
+        }
+        return json.dumps(data).encode() + headers["tr_id"].encode()
+
+    def template() -> bytes:
+        headers = kis.common.headers_tr("TTTC0802U")
+        return ds.order_cash_content(order) + headers["tr_id"].encode()
+
+    return {
+        "order build dict": batched(build, 1000, 50),
+        "order build template": batched(template, 1000, 50),
+        "ws_senddata": batched(
+            lambda: ds.ws_senddata(True, "H0STASP0", "005930"), 1000, 50
+        ),
+    }
+
+
+def inventory() -> dict[str, Samples]:
+    inv = Inventory("005930", 1, 0.00015)
+    flip = [1.0]
+
+    def position() -> None:
+        flip[0] = -flip[0]
+        inv.filled_position(flip[0] * 3, 70000)
+
+    def total() -> None:
+        order = Buy(ORDER_TYPE.LIMIT, "005930", 10, 70000)
+        order.opened = 10
+        inv.add_order(order)
+        inv.filled_total(order, 4, 70000, 6)
+        inv.filled_total(order, 10, 70010, 0)
+
+    return {
+        "Inventory.filled_position": batched(position, 1000, 50),
+        "Inventory.filled_total": batched(total, 1000, 50),
+    }
+
+
+def book() -> dict[str, Samples]:
+    b = Book()
+    inv = Inventory("005930", 1, 0)
+    orders = []
+    for i in range(1000000):
+        order = Buy(ORDER_TYPE.LIMIT, "005930", 1, 70000)
+        order.uid = "%010d" % i
+        orders.append(order)
+    it = iter(orders)
+    add = batched(lambda: b.add(next(it), inv), 1000, 1000)
+    uids = [o.uid for o in orders[::997]]
+    get = batched(lambda: [b.get(uid) for uid in uids], 1, 200)
+    return {
+        "Book.add 1M": add,
+        "Book.get 1M": [s / len(uids) for s in get],
+    }
+
+
+def percentile(samples: Samples, p: float) -> float:
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(p * len(s)))]
+
+
+def summarize(results: dict[str, Samples]) -> dict[str, dict[str, float]]:
+    return {
+        name: {
+            "p50": percentile(samples, 0.5),
+            "p99": percentile(samples, 0.99),
+            "ops": 1 / statistics.mean(samples),
+        }
+        for name, samples in results.items()
+    }
+
+
+def report(
+    summary: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    tolerance: float,
+) -> list[str]:
+    regressions = []
+    print(
+        "%-28s %12s %12s %12s %9s"
+        % ("benchmark", "ops/s", "p50 us", "p99 us", "vs base")
+    )
+    for name, s in summary.items():
+        base: Optional[dict[str, float]] = baseline.get(name)
+        change = ""
+        if base is not None:
+            ratio = s["p50"] / base["p50"] - 1
+            change = "%+8.1f%%" % (ratio * 100)
+            if ratio > tolerance:
+                regressions.append(name)
+                change += " !"
+        print(
+            "%-28s %12.0f %12.2f %12.2f %9s"
+            % (name, s["ops"], s["p50"] * 1e6, s["p99"] * 1e6, change)
+        )
+    return regressions
+
+
+def main(
+    save: bool = False,
+    baseline: str = BASELINE,
+    tolerance: float = 0.25,
+    port: int = PORT,
+) -> None:
+    server = serve(port)
+    results = asyncio.run(http(port))
+    server.should_exit = True
+    results.update(aes())
+    results.update(templates())
+    results.update(inventory())
+    results.update(book())
+    summary = summarize(results)
+    saved: dict[str, dict[str, float]] = {}
+    if os.path.exists(baseline):
+        with open(baseline, encoding="utf-8") as f:
+            saved = json.load(f)
+    regressions = report(summary, saved, tolerance)
+    if save:
+        with open(baseline, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, sort_keys=True)
+            f.write("\n")
+    elif regressions:
+        print("regressions: %s" % ", ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
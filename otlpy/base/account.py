@@ -1,11 +1,21 @@
+import sys
 from typing import Any, Optional
 
-import numpy as np
+from loguru import logger
 
 from otlpy.base import market
 
 
 class Order(market.BaseOrder):
+    __slots__ = (
+        "rdata",
+        "uid",
+        "orgno",
+        "filled",
+        "filled_price",
+        "opened",
+    )
+
     def __init__(
         self,
         oside: market.ORDER_SIDE,
@@ -17,6 +27,7 @@ class Order(market.BaseOrder):
         super().__init__(ticker, oside, otype, qty, price)
         self.rdata: dict[str, Any] = {}
         self.uid = ""
+        self.orgno = ""
         self.filled: float = 0
         self.filled_price: float = 0
         self.opened: float = 0
@@ -40,6 +51,9 @@ class Order(market.BaseOrder):
         if opened > 0:
             self.opened -= opened
 
+    def compact(self) -> None:
+        self.rdata = {}
+
     def filled_total(
         self,
         total_filled: float,
@@ -60,6 +74,8 @@ class Order(market.BaseOrder):
 
 
 class Buy(Order):
+    __slots__ = ()
+
     def __init__(
         self,
         otype: market.ORDER_TYPE,
@@ -77,6 +93,8 @@ class Buy(Order):
 
 
 class Sell(Order):
+    __slots__ = ()
+
     def __init__(
         self,
         otype: market.ORDER_TYPE,
@@ -94,6 +112,8 @@ class Sell(Order):
 
 
 class Cancel(Order):
+    __slots__ = ("origin",)
+
     def __init__(
         self,
         origin: Order,
@@ -110,6 +130,8 @@ class Cancel(Order):
 
 
 class Replace(Order):
+    __slots__ = ("origin",)
+
     def __init__(
         self,
         origin: Order,
@@ -127,13 +149,26 @@ class Replace(Order):
 
 
 class Inventory:
+    __slots__ = (
+        "ticker",
+        "unit",
+        "cost",
+        "orders",
+        "realized_pnl",
+        "realized_cost",
+        "pos",
+        "price",
+        "opened_buy",
+        "opened_sell",
+    )
+
     def __init__(
         self,
         ticker: str,
         unit: float,
         cost: float,
     ) -> None:
-        self.ticker = ticker
+        self.ticker = sys.intern(ticker)
         self.unit = unit
         self.cost = cost
         self.orders: dict[str, Order] = {}
@@ -161,6 +196,15 @@ class Inventory:
         else:
             assert False
 
+    def reopened(self, order: Order, opened: float) -> None:
+        order.opened += opened
+        if order.oside == market.ORDER_SIDE.BUY:
+            self.opened_buy += opened
+        elif order.oside == market.ORDER_SIDE.SELL:
+            self.opened_sell += opened
+        else:
+            assert False
+
     def filled_position(
         self,
         pos: float,
@@ -170,14 +214,14 @@ class Inventory:
             spp = self.price * self.pos + price * pos
             self.pos += pos
             self.price = spp / self.pos
-        elif np.abs(pos) <= np.abs(self.pos):
+        elif abs(pos) <= abs(self.pos):
             self.realized_pnl += (self.price - price) * pos * self.unit
             self.pos += pos
         else:
             self.realized_pnl += (price - self.price) * self.pos * self.unit
             self.price = price
             self.pos += pos
-        self.realized_cost += np.abs(self.pos) * price * self.unit * self.cost
+        self.realized_cost += abs(self.pos) * price * self.unit * self.cost
 
     def filled_total(
         self,
@@ -202,17 +246,144 @@ class Inventory:
         if pos != 0:
             self.filled_position(pos, filled_price)
 
+    def filled(
+        self,
+        order: Order,
+        filled: float,
+        filled_price: float,
+    ) -> None:
+        total_filled = order.filled + filled
+        total_filled_price = (
+            order.filled * order.filled_price + filled * filled_price
+        ) / total_filled
+        self.filled_total(
+            order,
+            total_filled,
+            total_filled_price,
+            order.opened - filled,
+        )
+
+    def cancelled(self, order: Order) -> None:
+        self.filled_total(order, order.filled, order.filled_price, 0)
+
 
 class Book:
+    __slots__ = ("ois", "archive", "opened", "children")
+
     def __init__(self) -> None:
         self.ois: dict[str, tuple[Order, Inventory]] = {}
+        self.archive: dict[str, tuple[Order, Inventory]] = {}
+        # open orders by (ticker, side), dicts keep submission order
+        self.opened: dict[tuple[str, market.ORDER_SIDE], dict[str, Order]] = {}
+        self.children: dict[str, list[Order]] = {}
 
     def add(self, order: Order, inventory: Inventory) -> None:
-        self.ois[order.uid] = (order, inventory)
+        if isinstance(order, Cancel):
+            # nothing to fill, the origin stays open until confirmed
+            order.opened = 0
+        elif isinstance(order, Replace):
+            # the child carries the origin's open qty from here on
+            self.cancelled(order.origin.uid)
         inventory.add_order(order)
+        self.attach(order, inventory)
+
+    def attach(self, order: Order, inventory: Inventory) -> None:
+        # inventory totals already account for the order, e.g. on restore
+        self.ois[order.uid] = (order, inventory)
+        inventory.orders[order.uid] = order
+        if isinstance(order, (Cancel, Replace)):
+            self.children.setdefault(order.origin.uid, []).append(order)
+        self.update(order)
 
     def get(self, uid: str) -> tuple[Optional[Order], Optional[Inventory]]:
         oi = self.ois.get(uid)
         if oi is None:
-            return None, None
+            oi = self.archive.get(uid)
+            if oi is None:
+                return None, None
         return oi
+
+    def update(self, order: Order) -> None:
+        key = (order.ticker, order.oside)
+        if order.opened > 0:
+            self.opened.setdefault(key, {})[order.uid] = order
+            return
+        opened = self.opened.get(key)
+        if opened is not None:
+            opened.pop(order.uid, None)
+        oi = self.ois.pop(order.uid, None)
+        if oi is not None:
+            self.archive[order.uid] = oi
+
+    def cancelled(self, uid: str) -> bool:
+        order, inventory = self.get(uid)
+        if order is None or inventory is None:
+            return False
+        if order.opened > 0:
+            inventory.cancelled(order)
+        self.update(order)
+        return True
+
+    def filled(self, uid: str, filled: float, filled_price: float) -> bool:
+        order, inventory = self.get(uid)
+        if order is None or inventory is None:
+            return False
+        if filled > order.opened:
+            self.reclaim(order, inventory, filled - order.opened)
+        inventory.filled(order, filled, filled_price)
+        self.update(order)
+        return True
+
+    def reclaim(self, order: Order, inventory: Inventory, qty: float) -> None:
+        # the origin filled while its replace was in flight, the replace
+        # holds that qty and gives it back
+        for child in self.children.get(order.uid, ()):
+            if qty <= 0:
+                break
+            if not isinstance(child, Replace) or child.opened <= 0:
+                continue
+            take = min(qty, child.opened)
+            inventory.filled_total(
+                child, child.filled, child.filled_price, child.opened - take
+            )
+            self.update(child)
+            inventory.reopened(order, take)
+            qty -= take
+        if qty > 0:
+            # more filled than was ever open, keep the position right
+            logger.error("\n%s\n%s" % (order.uid, qty))
+            inventory.reopened(order, qty)
+
+    def filled_total(
+        self,
+        uid: str,
+        total_filled: float,
+        total_filled_price: float,
+        total_opened: float,
+    ) -> bool:
+        order, inventory = self.get(uid)
+        if order is None or inventory is None:
+            return False
+        inventory.filled_total(
+            order, total_filled, total_filled_price, total_opened
+        )
+        self.update(order)
+        return True
+
+    def open_orders(
+        self,
+        ticker: str,
+        side: Optional[market.ORDER_SIDE] = None,
+    ) -> list[Order]:
+        sides = list(market.ORDER_SIDE) if side is None else [side]
+        orders: list[Order] = []
+        for s in sides:
+            orders.extend(self.opened.get((ticker, s), {}).values())
+        return orders
+
+    def open_tickers(self) -> list[str]:
+        return list({ticker for (ticker, _), o in self.opened.items() if o})
+
+    def chain(self, uid: str) -> list[Order]:
+        # cancel/replace orders issued against uid, in submission order
+        return self.children.get(uid, [])
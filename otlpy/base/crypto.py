@@ -1,7 +1,7 @@
-from base64 import b64decode
+from base64 import b64decode, b64encode
 
 from Crypto.Cipher import AES
-from Crypto.Util.Padding import unpad
+from Crypto.Util.Padding import pad, unpad
 
 
 def aes_cbc_base64_dec(key: str, iv: str, cipher_text: str) -> str:
@@ -9,3 +9,25 @@ def aes_cbc_base64_dec(key: str, iv: str, cipher_text: str) -> str:
     return bytes.decode(
         unpad(cipher.decrypt(b64decode(cipher_text)), AES.block_size)
     )
+
+
+class AESCBCBase64Decryptor:
+    def __init__(self, key: str, iv: str) -> None:
+        # CBC cipher objects are single use, but ECB keeps only the
+        # expanded key, so one instance serves every message.
+        self.ecb = AES.new(key.encode("utf-8"), AES.MODE_ECB)
+        self.iv = iv.encode("utf-8")
+
+    def decrypt(self, cipher_text: str) -> str:
+        c = b64decode(cipher_text)
+        x = int.from_bytes(self.ecb.decrypt(c), "big") ^ int.from_bytes(
+            self.iv + c[: -AES.block_size], "big"
+        )
+        return bytes.decode(unpad(x.to_bytes(len(c), "big"), AES.block_size))
+
+
+def aes_cbc_base64_enc(key: str, iv: str, plain_text: str) -> str:
+    cipher = AES.new(key.encode("utf-8"), AES.MODE_CBC, iv.encode("utf-8"))
+    return bytes.decode(
+        b64encode(cipher.encrypt(pad(plain_text.encode(), AES.block_size)))
+    )
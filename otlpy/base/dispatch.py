@@ -0,0 +1,144 @@
+import asyncio
+from collections import deque
+from enum import Enum, auto
+from typing import Any, Optional
+
+
+class POLICY(Enum):
+    DROP = auto()
+    CONFLATE = auto()
+    LOSSLESS = auto()
+
+
+Key = tuple[str, str]
+
+
+class Consumer:
+    __slots__ = (
+        "name",
+        "maxsize",
+        "lossless",
+        "lossy",
+        "latest",
+        "event",
+        "delivered",
+        "dropped",
+        "conflated",
+    )
+
+    def __init__(self, name: str, maxsize: int) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        # fills are never dropped and are delivered before market data
+        self.lossless: deque[tuple[Key, Any]] = deque()
+        self.lossy: deque[tuple[Key, Any]] = deque()
+        self.latest: dict[Key, Any] = {}
+        self.event = asyncio.Event()
+        self.delivered = 0
+        self.dropped = 0
+        self.conflated = 0
+
+    def depth(self) -> int:
+        return len(self.lossless) + len(self.lossy)
+
+    def put(self, key: Key, item: Any, policy: POLICY) -> None:
+        if policy == POLICY.LOSSLESS:
+            self.lossless.append((key, item))
+        elif policy == POLICY.CONFLATE and key in self.latest:
+            # the queued entry picks up the newest value when it is taken
+            self.latest[key] = item
+            self.conflated += 1
+            return
+        else:
+            if len(self.lossy) >= self.maxsize:
+                old, _ = self.lossy.popleft()
+                self.latest.pop(old, None)
+                self.dropped += 1
+            self.lossy.append((key, item))
+            if policy == POLICY.CONFLATE:
+                self.latest[key] = item
+        self.event.set()
+
+    def get_nowait(self) -> Optional[tuple[Key, Any]]:
+        if self.lossless:
+            self.delivered += 1
+            return self.lossless.popleft()
+        if self.lossy:
+            key, item = self.lossy.popleft()
+            item = self.latest.pop(key, item)
+            self.delivered += 1
+            return key, item
+        self.event.clear()
+        return None
+
+    async def get(self) -> tuple[Key, Any]:
+        while True:
+            ki = self.get_nowait()
+            if ki is not None:
+                return ki
+            await self.event.wait()
+
+    def metrics(self) -> dict[str, int]:
+        return {
+            "depth": self.depth(),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "conflated": self.conflated,
+        }
+
+
+class Dispatcher:
+    def __init__(
+        self,
+        policies: Optional[dict[str, POLICY]] = None,
+        maxsize: int = 1024,
+    ) -> None:
+        self.policies = policies or {}
+        self.maxsize = maxsize
+        self.consumers: dict[str, Consumer] = {}
+        # tr_id -> ticker ("" for every ticker) -> consumers
+        self.routes: dict[str, dict[str, list[Consumer]]] = {}
+
+    def consumer(self, name: str, maxsize: Optional[int] = None) -> Consumer:
+        c = self.consumers.get(name)
+        if c is None:
+            c = Consumer(name, self.maxsize if maxsize is None else maxsize)
+            self.consumers[name] = c
+        return c
+
+    def subscribe(
+        self,
+        consumer: Consumer,
+        tr_id: str,
+        ticker: str = "",
+    ) -> None:
+        cs = self.routes.setdefault(tr_id, {}).setdefault(ticker, [])
+        if consumer not in cs:
+            cs.append(consumer)
+
+    def unsubscribe(
+        self,
+        consumer: Consumer,
+        tr_id: str,
+        ticker: str = "",
+    ) -> None:
+        cs = self.routes.get(tr_id, {}).get(ticker)
+        if cs is not None and consumer in cs:
+            cs.remove(consumer)
+
+    def publish(self, tr_id: str, ticker: str, item: Any) -> int:
+        # never blocks, a slow consumer only fills its own queue
+        tickers = self.routes.get(tr_id)
+        if tickers is None:
+            return 0
+        policy = self.policies.get(tr_id, POLICY.DROP)
+        key = (tr_id, ticker)
+        n = 0
+        for t in (ticker, ""):
+            for c in tickers.get(t, ()):
+                c.put(key, item, policy)
+                n += 1
+        return n
+
+    def metrics(self) -> dict[str, dict[str, int]]:
+        return {name: c.metrics() for name, c in self.consumers.items()}
@@ -0,0 +1,330 @@
+import glob
+import json
+import os
+import queue
+import threading
+from typing import Any, Optional, TextIO
+
+from loguru import logger
+
+from otlpy.base import market
+from otlpy.base.account import (
+    Book,
+    Buy,
+    Cancel,
+    Inventory,
+    Order,
+    Replace,
+    Sell,
+)
+
+ORDER_FIELDS = ("uid", "orgno", "filled", "filled_price", "opened")
+INVENTORY_FIELDS = (
+    "unit",
+    "cost",
+    "realized_pnl",
+    "realized_cost",
+    "pos",
+    "price",
+    "opened_buy",
+    "opened_sell",
+)
+
+Record = tuple[int, str, Any]
+
+
+def order_state(order: Order) -> dict[str, Any]:
+    state = {
+        "kind": type(order).__name__,
+        "ticker": order.ticker,
+        "oside": order.oside.name,
+        "otype": order.otype.name,
+        "qty": order.qty,
+        "price": order.price,
+    }
+    for field in ORDER_FIELDS:
+        state[field] = getattr(order, field)
+    if isinstance(order, (Cancel, Replace)):
+        state["origin"] = order.origin.uid
+    return state
+
+
+def order_from_state(state: dict[str, Any], book: Book) -> Order:
+    oside = market.ORDER_SIDE[state["oside"]]
+    otype = market.ORDER_TYPE[state["otype"]]
+    origin, _ = book.get(state.get("origin", ""))
+    order: Order
+    if origin is not None and state["kind"] == "Cancel":
+        order = Cancel(origin, otype)
+        order.qty = state["qty"]
+        order.price = state["price"]
+    elif origin is not None and state["kind"] == "Replace":
+        order = Replace(origin, otype, state["price"])
+        order.qty = state["qty"]
+    elif oside == market.ORDER_SIDE.BUY:
+        # also a cancel/replace whose origin was compacted away
+        order = Buy(otype, state["ticker"], state["qty"], state["price"])
+    else:
+        order = Sell(otype, state["ticker"], state["qty"], state["price"])
+    for field in ORDER_FIELDS:
+        setattr(order, field, state[field])
+    return order
+
+
+def inventory_state(inventory: Inventory) -> dict[str, Any]:
+    return {field: getattr(inventory, field) for field in INVENTORY_FIELDS}
+
+
+def inventory_from_state(ticker: str, state: dict[str, Any]) -> Inventory:
+    inventory = Inventory(ticker, state["unit"], state["cost"])
+    for field in INVENTORY_FIELDS:
+        setattr(inventory, field, state[field])
+    return inventory
+
+
+class JournaledBook(Book):
+    __slots__ = ("journal",)
+
+    def __init__(self, journal: Optional["Journal"] = None) -> None:
+        super().__init__()
+        self.journal = journal
+
+    def add(self, order: Order, inventory: Inventory) -> None:
+        if self.journal is not None:
+            self.journal.write(
+                "add",
+                [order_state(order), inventory.unit, inventory.cost],
+            )
+        super().add(order, inventory)
+
+    def cancelled(self, uid: str) -> bool:
+        if not super().cancelled(uid):
+            return False
+        if self.journal is not None:
+            self.journal.write("cancelled", [uid])
+        return True
+
+    def filled(self, uid: str, filled: float, filled_price: float) -> bool:
+        if not super().filled(uid, filled, filled_price):
+            return False
+        if self.journal is not None:
+            self.journal.write("filled", [uid, filled, filled_price])
+        return True
+
+    def filled_total(
+        self,
+        uid: str,
+        total_filled: float,
+        total_filled_price: float,
+        total_opened: float,
+    ) -> bool:
+        if not super().filled_total(
+            uid, total_filled, total_filled_price, total_opened
+        ):
+            return False
+        if self.journal is not None:
+            self.journal.write(
+                "filled_total",
+                [uid, total_filled, total_filled_price, total_opened],
+            )
+        return True
+
+
+class Journal:
+    def __init__(self, root: str, fsync: bool = False) -> None:
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.fsync = fsync
+        self.seq = 0
+        self.queue: queue.SimpleQueue[Optional[Record]] = queue.SimpleQueue()
+        self.thread: Optional[threading.Thread] = None
+
+    def segment_path(self, seq: int) -> str:
+        return os.path.join(self.root, "journal.%012d.log" % seq)
+
+    def snapshot_path(self) -> str:
+        return os.path.join(self.root, "snapshot.json")
+
+    def open_segment(self, seq: int) -> TextIO:
+        fd = os.open(
+            self.segment_path(seq),
+            os.O_WRONLY | os.O_CREAT | os.O_APPEND,
+            0o644,
+        )
+        return os.fdopen(fd, "a", encoding="utf-8")
+
+    def segments(self) -> list[str]:
+        return sorted(glob.glob(os.path.join(self.root, "journal.*.log")))
+
+    def write(self, op: str, data: Any) -> int:
+        # serialized and written by the writer thread
+        self.seq += 1
+        self.queue.put((self.seq, op, data))
+        return self.seq
+
+    def submitted(self, order: Order) -> int:
+        return self.write("submit", order_state(order))
+
+    def acked(self, sid: int, order: Order) -> None:
+        self.write("ack", [sid, order.uid, order.orgno])
+
+    def snapshot(
+        self,
+        book: Book,
+        inventories: dict[str, Inventory],
+    ) -> None:
+        # open orders and their origins, origins first
+        orders: list[dict[str, Any]] = []
+        seen: set[str] = set()
+
+        def visit(order: Order) -> None:
+            if order.uid in seen:
+                return
+            if isinstance(order, (Cancel, Replace)):
+                visit(order.origin)
+            seen.add(order.uid)
+            orders.append(order_state(order))
+
+        for order, _ in book.ois.values():
+            visit(order)
+        state = {
+            "seq": self.seq,
+            "inventories": {
+                ticker: inventory_state(inventory)
+                for ticker, inventory in inventories.items()
+            },
+            "orders": orders,
+        }
+        self.queue.put((self.seq, "snapshot", state))
+
+    def restore(
+        self,
+    ) -> tuple[JournaledBook, dict[str, Inventory], dict[int, Any]]:
+        book = JournaledBook()
+        inventories: dict[str, Inventory] = {}
+        # submissions without an ack, their outcome is unknown
+        pending: dict[int, Any] = {}
+        try:
+            with open(self.snapshot_path(), encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {"seq": 0, "inventories": {}, "orders": []}
+        self.seq = state["seq"]
+        for ticker, s in state["inventories"].items():
+            inventories[ticker] = inventory_from_state(ticker, s)
+        for s in state["orders"]:
+            order = order_from_state(s, book)
+            inventory = inventories.get(order.ticker)
+            if inventory is None:
+                inventory = inventories[order.ticker] = Inventory(
+                    order.ticker, 1, 0
+                )
+            book.attach(order, inventory)
+        for path in self.segments():
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        seq, op, data = json.loads(line)
+                    except ValueError:
+                        # torn write at the crash, nothing follows it
+                        logger.error("\n%s\n%s" % (path, line))
+                        break
+                    if seq <= self.seq:
+                        continue
+                    self.seq = seq
+                    self.replay(book, inventories, pending, seq, op, data)
+        book.journal = self
+        return book, inventories, pending
+
+    def replay(
+        self,
+        book: Book,
+        inventories: dict[str, Inventory],
+        pending: dict[int, Any],
+        seq: int,
+        op: str,
+        data: Any,
+    ) -> None:
+        if op == "add":
+            s, unit, cost = data
+            order = order_from_state(s, book)
+            inventory = inventories.get(order.ticker)
+            if inventory is None:
+                inventory = inventories[order.ticker] = Inventory(
+                    order.ticker, unit, cost
+                )
+            book.add(order, inventory)
+        elif op == "cancelled":
+            book.cancelled(*data)
+        elif op == "filled":
+            book.filled(*data)
+        elif op == "filled_total":
+            book.filled_total(*data)
+        elif op == "submit":
+            pending[seq] = data
+        elif op == "ack":
+            pending.pop(data[0], None)
+
+    def start(self) -> None:
+        if self.thread is None:
+            self.thread = threading.Thread(
+                target=self.run, args=(self.seq + 1,), daemon=True
+            )
+            self.thread.start()
+
+    def close(self) -> None:
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def flush(self, f: TextIO, lines: list[str]) -> None:
+        if not lines:
+            return
+        f.write("".join(lines))
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+        lines.clear()
+
+    def rotate(self, f: TextIO, seq: int, state: Any) -> TextIO:
+        tmp = self.snapshot_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as s:
+            json.dump(state, s, separators=(",", ":"))
+            s.flush()
+            os.fsync(s.fileno())
+        os.replace(tmp, self.snapshot_path())
+        f.close()
+        # every record up to seq is in the snapshot
+        current = self.segment_path(seq + 1)
+        for path in self.segments():
+            if path < current:
+                os.remove(path)
+        return self.open_segment(seq + 1)
+
+    def run(self, seq: int) -> None:
+        # one batch per wakeup, so the event loop only pays for a put
+        f = self.open_segment(seq)
+        lines: list[str] = []
+        while True:
+            batch = [self.queue.get()]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            for record in batch:
+                if record is None:
+                    self.flush(f, lines)
+                    f.close()
+                    return
+                seq, op, data = record
+                if op == "snapshot":
+                    self.flush(f, lines)
+                    f = self.rotate(f, seq, data)
+                else:
+                    lines.append(
+                        json.dumps([seq, op, data], separators=(",", ":"))
+                        + "\n"
+                    )
+            self.flush(f, lines)
@@ -0,0 +1,226 @@
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from otlpy.base.market import PQN, LimitOrderBook
+
+LEVELS = 10
+
+# axis 0: side, axis 1: field, axis 2: level
+BID = 0
+ASK = 1
+PRICE = 0
+QTY = 1
+NUM = 2
+
+Array = np.ndarray[Any, Any]
+
+
+def empty(levels: int = LEVELS, n: Optional[int] = None) -> Array:
+    if n is None:
+        return np.zeros((2, 3, levels))
+    return np.zeros((n, 2, 3, levels))
+
+
+def mid(data: Array) -> Array:
+    return (data[..., BID, PRICE, 0] + data[..., ASK, PRICE, 0]) / 2
+
+
+def spread(data: Array) -> Array:
+    return data[..., ASK, PRICE, 0] - data[..., BID, PRICE, 0]
+
+
+def microprice(data: Array) -> Array:
+    bid = data[..., BID, PRICE, 0]
+    ask = data[..., ASK, PRICE, 0]
+    bid_qty = data[..., BID, QTY, 0]
+    ask_qty = data[..., ASK, QTY, 0]
+    total = bid_qty + ask_qty
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(
+            total > 0,
+            (bid * ask_qty + ask * bid_qty) / total,
+            (bid + ask) / 2,
+        )
+
+
+def imbalance(data: Array, depth: int = LEVELS) -> Array:
+    bid_qty = data[..., BID, QTY, :depth].sum(axis=-1)
+    ask_qty = data[..., ASK, QTY, :depth].sum(axis=-1)
+    total = bid_qty + ask_qty
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, (bid_qty - ask_qty) / total, 0.0)
+
+
+def vwap(data: Array, side: int, size: float) -> Array:
+    # average price to take `size` from `side`, nan if depth is short
+    price = data[..., side, PRICE, :]
+    qty = data[..., side, QTY, :]
+    ahead = np.cumsum(qty, axis=-1) - qty
+    take = np.clip(size - ahead, 0, qty)
+    filled = take.sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(
+            filled >= size, (take * price).sum(axis=-1) / filled, np.nan
+        )
+
+
+class ArrayBook:
+    __slots__ = ("timestamp", "ticker", "data")
+
+    def __init__(
+        self,
+        timestamp: str,
+        ticker: str,
+        data: Optional[Array] = None,
+    ) -> None:
+        self.timestamp = timestamp
+        self.ticker = ticker
+        self.data = empty() if data is None else data
+
+    @property
+    def bid(self) -> Array:
+        bid: Array = self.data[BID]
+        return bid
+
+    @property
+    def ask(self) -> Array:
+        ask: Array = self.data[ASK]
+        return ask
+
+    def mid(self) -> float:
+        return float(mid(self.data))
+
+    def spread(self) -> float:
+        return float(spread(self.data))
+
+    def microprice(self) -> float:
+        return float(microprice(self.data))
+
+    def imbalance(self, depth: int = LEVELS) -> float:
+        return float(imbalance(self.data, depth))
+
+    def vwap(self, side: int, size: float) -> float:
+        return float(vwap(self.data, side, size))
+
+    def limitorderbook(self) -> LimitOrderBook:
+        return LimitOrderBook(
+            self.timestamp,
+            self.ticker,
+            [PQN(float(p), float(q), int(n)) for p, q, n in self.data[BID].T],
+            [PQN(float(p), float(q), int(n)) for p, q, n in self.data[ASK].T],
+        )
+
+    @classmethod
+    def from_limitorderbook(cls, lob: LimitOrderBook) -> "ArrayBook":
+        book = cls(lob.timestamp, lob.ticker)
+        for side, pqns in ((BID, lob.bid), (ASK, lob.ask)):
+            for i, pqn in enumerate(pqns[:LEVELS]):
+                book.data[side, PRICE, i] = pqn.price
+                book.data[side, QTY, i] = pqn.qty
+                book.data[side, NUM, i] = pqn.num or 0
+        return book
+
+
+class ArrayBooks:
+    def __init__(self, tickers: list[str], levels: int = LEVELS) -> None:
+        self.tickers = list(tickers)
+        self.index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.timestamps = [""] * len(self.tickers)
+        self.data = empty(levels, len(self.tickers))
+
+    def book(self, ticker: str) -> ArrayBook:
+        i = self.index[ticker]
+        return ArrayBook(self.timestamps[i], ticker, self.data[i])
+
+    def update(
+        self,
+        timestamp: str,
+        ticker: str,
+        bid: Array,
+        bid_qty: Array,
+        ask: Array,
+        ask_qty: Array,
+    ) -> int:
+        i = self.index[ticker]
+        row = self.data[i]
+        row[BID, PRICE] = bid
+        row[BID, QTY] = bid_qty
+        row[ASK, PRICE] = ask
+        row[ASK, QTY] = ask_qty
+        self.timestamps[i] = timestamp
+        return i
+
+    def mid(self) -> Array:
+        return mid(self.data)
+
+    def spread(self) -> Array:
+        return spread(self.data)
+
+    def microprice(self) -> Array:
+        return microprice(self.data)
+
+    def imbalance(self, depth: int = LEVELS) -> Array:
+        return imbalance(self.data, depth)
+
+    def vwap(self, side: int, size: float) -> Array:
+        return vwap(self.data, side, size)
+
+
+class BookState(ArrayBooks):
+    def __init__(self, tickers: list[str], levels: int = LEVELS) -> None:
+        super().__init__(tickers, levels)
+        self.books = [
+            ArrayBook("", ticker, self.data[i])
+            for i, ticker in enumerate(self.tickers)
+        ]
+        # changed[i, side, level] for the last update of ticker i
+        self.changed = np.zeros((len(self.tickers), 2, levels), dtype=bool)
+        self.subscribers: list[
+            list[tuple[int, Callable[[ArrayBook, Array], None]]]
+        ] = [[] for _ in self.tickers]
+
+    def book(self, ticker: str) -> ArrayBook:
+        return self.books[self.index[ticker]]
+
+    def subscribe(
+        self,
+        ticker: str,
+        callback: Callable[[ArrayBook, Array], None],
+        depth: int = 1,
+    ) -> None:
+        self.subscribers[self.index[ticker]].append((depth, callback))
+
+    def unsubscribe(
+        self,
+        ticker: str,
+        callback: Callable[[ArrayBook, Array], None],
+    ) -> None:
+        i = self.index[ticker]
+        self.subscribers[i] = [
+            s for s in self.subscribers[i] if s[1] is not callback
+        ]
+
+    def update(
+        self,
+        timestamp: str,
+        ticker: str,
+        bid: Array,
+        bid_qty: Array,
+        ask: Array,
+        ask_qty: Array,
+    ) -> int:
+        i = self.index[ticker]
+        row = self.data[i]
+        changed = self.changed[i]
+        np.not_equal(row[BID, PRICE], bid, out=changed[BID])
+        changed[BID] |= row[BID, QTY] != bid_qty
+        np.not_equal(row[ASK, PRICE], ask, out=changed[ASK])
+        changed[ASK] |= row[ASK, QTY] != ask_qty
+        super().update(timestamp, ticker, bid, bid_qty, ask, ask_qty)
+        book = self.books[i]
+        book.timestamp = timestamp
+        for depth, callback in self.subscribers[i]:
+            if changed[:, :depth].any():
+                callback(book, changed)
+        return i
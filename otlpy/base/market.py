@@ -1,3 +1,4 @@
+import sys
 from enum import Enum, auto
 from typing import Optional
 
@@ -23,6 +24,8 @@ class ORDER_TYPE(Enum):
 
 
 class BaseOrder:
+    __slots__ = ("ticker", "oside", "otype", "qty", "price")
+
     def __init__(
         self,
         ticker: str,
@@ -31,7 +34,7 @@ class BaseOrder:
         qty: float,
         price: float,
     ) -> None:
-        self.ticker = ticker
+        self.ticker = sys.intern(ticker)
         self.oside = oside
         self.otype = otype
         self.qty = qty
@@ -39,6 +42,8 @@ class BaseOrder:
 
 
 class PQN:
+    __slots__ = ("price", "qty", "num")
+
     def __init__(
         self,
         price: float,
@@ -51,6 +56,8 @@ class PQN:
 
 
 class LimitOrderBook:
+    __slots__ = ("timestamp", "ticker", "bid", "ask")
+
     def __init__(
         self,
         timestamp: str,
@@ -59,12 +66,14 @@ class LimitOrderBook:
         ask: list[PQN],
     ) -> None:
         self.timestamp = timestamp
-        self.ticker = ticker
+        self.ticker = sys.intern(ticker)
         self.bid = bid
         self.ask = ask
 
 
 class Price:
+    __slots__ = ("timestamp", "ticker", "trade", "bid", "ask")
+
     def __init__(
         self,
         timestamp: str,
@@ -74,7 +83,7 @@ class Price:
         ask: Optional[PQN],
     ) -> None:
         self.timestamp = timestamp
-        self.ticker = ticker
+        self.ticker = sys.intern(ticker)
         self.trade = trade
         self.bid = bid
         self.ask = ask
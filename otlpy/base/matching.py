@@ -0,0 +1,245 @@
+import math
+from typing import Any, Callable, Optional
+
+from otlpy.base import market
+from otlpy.base.account import Cancel, Inventory, Order, Replace
+from otlpy.base.lob import ASK, BID, PRICE, QTY, ArrayBook
+
+
+class Resting:
+    __slots__ = ("order", "inventory", "ahead", "level", "traded")
+
+    def __init__(
+        self,
+        order: Order,
+        inventory: Inventory,
+        ahead: float,
+        level: float,
+    ) -> None:
+        self.order = order
+        self.inventory = inventory
+        # displayed qty queued before us, and the level qty last seen
+        self.ahead = ahead
+        self.level = level
+        # qty traded at our price since the level was last seen
+        self.traded: float = 0
+
+
+class MatchingEngine:
+    def __init__(
+        self,
+        execution: market.MARKET_EXECUTION = (
+            market.MARKET_EXECUTION.PRICE_TIME_PRIORITY
+        ),
+        mtype: market.MARKET_TYPE = market.MARKET_TYPE.LIT_POOL,
+    ) -> None:
+        self.execution = execution
+        self.mtype = mtype
+        self.resting: dict[str, Resting] = {}
+        self.fills: list[tuple[str, str, float, float]] = []
+        self.seq = 0
+        self.trades = False
+        self.timestamp = ""
+        self.bid: list[float] = []
+        self.bid_qty: list[float] = []
+        self.ask: list[float] = []
+        self.ask_qty: list[float] = []
+
+    def fill(self, resting: Resting, qty: float, price: float) -> None:
+        qty = min(qty, resting.order.opened)
+        if qty <= 0:
+            return
+        resting.inventory.filled(resting.order, qty, price)
+        self.fills.append((self.timestamp, resting.order.uid, qty, price))
+        if resting.order.opened <= 0:
+            self.resting.pop(resting.order.uid, None)
+
+    def submit(self, order: Order, inventory: Inventory) -> Order:
+        self.seq += 1
+        order.uid = "%010d" % self.seq
+        if isinstance(order, (Cancel, Replace)):
+            resting = self.resting.pop(order.origin.uid, None)
+            if resting is None:
+                return order
+            opened = order.origin.opened
+            inventory.cancelled(order.origin)
+            if isinstance(order, Cancel):
+                return order
+            order.opened = opened
+        else:
+            order.opened = order.qty
+        inventory.add_order(order)
+        resting = Resting(order, inventory, 0, 0)
+        if self.mtype == market.MARKET_TYPE.DARK_POOL:
+            self.resting[order.uid] = resting
+            self.cross_mid(resting)
+            return order
+        self.take(resting)
+        if order.opened > 0:
+            if order.otype == market.ORDER_TYPE.MARKET:
+                inventory.cancelled(order)
+            else:
+                self.rest(resting)
+        return order
+
+    def limit(self, order: Order) -> float:
+        if order.otype == market.ORDER_TYPE.LIMIT:
+            return order.price
+        if order.oside == market.ORDER_SIDE.BUY:
+            return math.inf
+        return 0
+
+    def take(self, resting: Resting) -> None:
+        order = resting.order
+        limit = self.limit(order)
+        if order.oside == market.ORDER_SIDE.BUY:
+            prices, qtys, sign = self.ask, self.ask_qty, 1
+        else:
+            prices, qtys, sign = self.bid, self.bid_qty, -1
+        for i, price in enumerate(prices):
+            if order.opened <= 0 or sign * (price - limit) > 0:
+                break
+            qty = min(qtys[i], order.opened)
+            if qty > 0:
+                # liquidity taken stays consumed until the next snapshot
+                qtys[i] -= qty
+                self.fill(resting, qty, price)
+
+    def displayed(self, resting: Resting) -> Optional[float]:
+        # own-side qty at the order price, None if outside the shown depth
+        order = resting.order
+        if order.oside == market.ORDER_SIDE.BUY:
+            prices, qtys, sign = self.bid, self.bid_qty, 1
+        else:
+            prices, qtys, sign = self.ask, self.ask_qty, -1
+        if not prices or sign * (order.price - prices[-1]) < 0:
+            return None
+        for price, qty in zip(prices, qtys):
+            if price == order.price:
+                return qty
+        return 0
+
+    def rest(self, resting: Resting) -> None:
+        level = self.displayed(resting) or 0
+        resting.ahead = level
+        resting.level = level
+        self.resting[resting.order.uid] = resting
+
+    def crossed(self, order: Order) -> bool:
+        if order.oside == market.ORDER_SIDE.BUY:
+            return bool(self.ask_qty) and 0 < self.ask[0] <= order.price
+        return bool(self.bid_qty) and order.price <= self.bid[0]
+
+    def top(self, order: Order) -> bool:
+        if order.oside == market.ORDER_SIDE.BUY:
+            return bool(self.bid) and order.price >= self.bid[0]
+        return bool(self.ask) and order.price <= self.ask[0]
+
+    def queue(self, resting: Resting, traded: float) -> float:
+        # qty of `traded` at our price that reaches us
+        if self.execution == market.MARKET_EXECUTION.PRO_RATA:
+            opened = resting.order.opened
+            return round(traded * opened / (resting.level + opened))
+        consumed = min(traded, resting.ahead)
+        resting.ahead -= consumed
+        return traded - consumed
+
+    def update(self, resting: Resting) -> None:
+        order = resting.order
+        if self.crossed(order):
+            self.fill(resting, order.opened, order.price)
+            return
+        traded = resting.traded
+        resting.traded = 0
+        level = self.displayed(resting)
+        if level is None:
+            return
+        decrease = resting.level - level
+        if decrease > 0:
+            if not self.trades and self.top(order):
+                self.fill(resting, self.queue(resting, decrease), order.price)
+            elif decrease > traded:
+                # trades already advanced the queue, the rest are cancels
+                # spread evenly through it
+                resting.ahead *= level / (resting.level - traded)
+        if self.top(order) and not level:
+            resting.ahead = 0
+        resting.ahead = min(resting.ahead, level)
+        resting.level = level
+
+    def cross_mid(self, resting: Resting) -> None:
+        if not self.bid_qty or not self.ask_qty:
+            return
+        mid = (self.bid[0] + self.ask[0]) / 2
+        order = resting.order
+        if order.oside == market.ORDER_SIDE.BUY:
+            if mid <= self.limit(order):
+                self.fill(resting, self.ask_qty[0], mid)
+        elif mid >= self.limit(order):
+            self.fill(resting, self.bid_qty[0], mid)
+
+    def on_book(
+        self,
+        timestamp: str,
+        bid: list[float],
+        bid_qty: list[float],
+        ask: list[float],
+        ask_qty: list[float],
+    ) -> None:
+        self.timestamp = timestamp
+        self.bid = bid
+        self.bid_qty = bid_qty
+        self.ask = ask
+        self.ask_qty = ask_qty
+        if not self.resting:
+            return
+        update = (
+            self.cross_mid
+            if self.mtype == market.MARKET_TYPE.DARK_POOL
+            else self.update
+        )
+        for resting in list(self.resting.values()):
+            update(resting)
+
+    def on_arraybook(self, book: ArrayBook) -> None:
+        self.on_book(
+            book.timestamp,
+            book.data[BID, PRICE].tolist(),
+            book.data[BID, QTY].tolist(),
+            book.data[ASK, PRICE].tolist(),
+            book.data[ASK, QTY].tolist(),
+        )
+
+    def on_trade(self, timestamp: str, price: float, qty: float) -> None:
+        self.trades = True
+        self.timestamp = timestamp
+        if self.mtype == market.MARKET_TYPE.DARK_POOL:
+            return
+        for resting in list(self.resting.values()):
+            order = resting.order
+            if order.oside == market.ORDER_SIDE.BUY:
+                through = price < order.price
+            else:
+                through = price > order.price
+            if through:
+                self.fill(resting, qty, order.price)
+            elif price == order.price:
+                resting.traded += qty
+                self.fill(resting, self.queue(resting, qty), order.price)
+
+    def replay(
+        self,
+        records: Any,
+        callback: Optional[Callable[["MatchingEngine", Any], None]] = None,
+    ) -> None:
+        # records from tickstore.TickReader(..., tickstore.BOOK)
+        for r in records:
+            self.on_book(
+                str(r["time"]),
+                r["bid"].tolist(),
+                r["bid_qty"].tolist(),
+                r["ask"].tolist(),
+                r["ask_qty"].tolist(),
+            )
+            if callback is not None:
+                callback(self, r)
@@ -0,0 +1,153 @@
+import time
+from typing import Any
+
+from fastapi import APIRouter
+
+
+class Histogram:
+    __slots__ = ("sub_bits", "counts", "count", "total", "max")
+
+    def __init__(self, sub_bits: int = 5, rows: int = 40) -> None:
+        # log-linear microsecond buckets, relative error below 2**-sub_bits
+        self.sub_bits = sub_bits
+        self.counts = [0] * ((rows + 1) << sub_bits)
+        self.count = 0
+        self.total: float = 0
+        self.max: float = 0
+
+    def index(self, us: int) -> int:
+        e = us.bit_length() - self.sub_bits - 1
+        if e < 0:
+            return us
+        i = ((e + 1) << self.sub_bits) + (us >> e) - (1 << self.sub_bits)
+        return min(i, len(self.counts) - 1)
+
+    def value(self, i: int) -> int:
+        e = (i >> self.sub_bits) - 1
+        if e < 0:
+            return i
+        mask = (1 << self.sub_bits) - 1
+        return ((i & mask) + (1 << self.sub_bits)) << e
+
+    def record(self, seconds: float) -> None:
+        self.counts[self.index(int(seconds * 1e6))] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p: float) -> float:
+        if not self.count:
+            return 0
+        rank = max(1, round(p * self.count))
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(self.value(i) / 1e6, self.max)
+        return self.max
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "p999": self.percentile(0.999),
+            "max": self.max,
+        }
+
+
+class Trace:
+    __slots__ = ("metrics", "key", "started")
+
+    def __init__(self, metrics: "Metrics", key: str) -> None:
+        self.metrics = metrics
+        self.key = key
+        self.started: dict[str, float] = {}
+
+    async def __call__(self, name: str, info: dict[str, Any]) -> None:
+        # httpx trace extension, e.g. connection.connect_tcp.started
+        phase, _, event = name.rpartition(".")
+        if event == "started":
+            self.started[phase] = time.perf_counter()
+        elif event in ("complete", "failed"):
+            t = self.started.pop(phase, None)
+            if t is not None:
+                self.metrics.histogram(self.key + " " + phase).record(
+                    time.perf_counter() - t
+                )
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self.enabled = True
+        self.trace = False
+        self.histograms: dict[str, Histogram] = {}
+        self.counters: dict[str, dict[str, int]] = {}
+
+    def histogram(self, key: str) -> Histogram:
+        h = self.histograms.get(key)
+        if h is None:
+            h = self.histograms[key] = Histogram()
+        return h
+
+    def extensions(self, key: str) -> dict[str, Any]:
+        if not self.trace:
+            return {}
+        return {"trace": Trace(self, key)}
+
+    def counter(self, key: str) -> dict[str, int]:
+        counters = self.counters.get(key)
+        if counters is None:
+            counters = self.counters[key] = {
+                "requests": 0,
+                "http_errors": 0,
+                "rt_errors": 0,
+                "exceptions": 0,
+            }
+        return counters
+
+    def record(
+        self,
+        key: str,
+        elapsed: float,
+        status_code: int,
+        rdata: dict[str, Any],
+        exception: bool = False,
+    ) -> None:
+        if not self.enabled:
+            return
+        self.histogram(key).record(elapsed)
+        counters = self.counter(key)
+        counters["requests"] += 1
+        if exception:
+            # no usable response, e.g. a timeout or a body that won't parse
+            counters["exceptions"] += 1
+        if status_code and status_code != 200:
+            counters["http_errors"] += 1
+        elif not exception and rdata.get("rt_cd", "0") != "0":
+            counters["rt_errors"] += 1
+
+    def reset(self) -> None:
+        self.histograms.clear()
+        self.counters.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "latency": {k: h.summary() for k, h in self.histograms.items()},
+            "counters": {k: dict(c) for k, c in self.counters.items()},
+        }
+
+
+metrics = Metrics()
+
+
+def router(m: Metrics = metrics) -> APIRouter:
+    r = APIRouter()
+
+    @r.get("/metrics")
+    async def get_metrics() -> dict[str, Any]:
+        return m.snapshot()
+
+    return r
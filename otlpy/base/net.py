@@ -1,10 +1,220 @@
 import asyncio
-from typing import Any, Optional
+import importlib.util
+import socket
+import time
+from typing import Any, Awaitable, Callable, Optional
 
-from httpx import AsyncClient, Headers, Response, codes
+from httpx import (
+    AsyncClient,
+    ConnectError,
+    ConnectTimeout,
+    Headers,
+    HTTPError,
+    Limits,
+    Request,
+    Response,
+    codes,
+)
 from loguru import logger
 from websockets.legacy.client import Connect
 
+from otlpy.base.metrics import metrics
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def reserve(self, now: float) -> float:
+        self.tokens = min(
+            self.burst, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0
+        return -self.tokens / self.rate
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        budgets: Optional[dict[str, tuple[float, float]]] = None,
+    ) -> None:
+        self.bucket = TokenBucket(rate, burst)
+        self.buckets = {
+            key: TokenBucket(r, b) for key, (r, b) in (budgets or {}).items()
+        }
+
+    async def acquire(self, key: str) -> None:
+        # reservations are taken synchronously, so callers are served in
+        # arrival order without holding a lock across the sleep
+        now = time.monotonic()
+        wait = self.bucket.reserve(now)
+        bucket = self.buckets.get(key)
+        if bucket is not None:
+            wait = max(wait, bucket.reserve(now))
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+LIMITS = Limits(
+    max_connections=20,
+    max_keepalive_connections=20,
+    keepalive_expiry=120,
+)
+
+Trace = Callable[[str, dict[str, Any]], Awaitable[None]]
+
+
+class ClientTrace:
+    __slots__ = ("client", "trace")
+
+    def __init__(self, client: "HTTPClient", trace: Optional[Trace]) -> None:
+        self.client = client
+        self.trace = trace
+
+    async def __call__(self, name: str, info: dict[str, Any]) -> None:
+        if name == "connection.connect_tcp.complete":
+            self.client.connections += 1
+        if self.trace is not None:
+            await self.trace(name, info)
+
+
+class HTTPClient(AsyncClient):
+    def __init__(
+        self,
+        base_url: str,
+        timeout: Optional[float],
+        limiter: Optional[RateLimiter],
+        limits: Limits = LIMITS,
+        http2: bool = False,
+    ) -> None:
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("h2 is not installed, using HTTP/1.1")
+            http2 = False
+        super().__init__(
+            base_url=base_url,
+            timeout=timeout,
+            limits=limits,
+            http2=http2,
+        )
+        self.limiter = limiter
+        self.pool_size = limits.max_keepalive_connections or 1
+        self.keepalive_expiry = limits.keepalive_expiry
+        self.host = self.base_url.host
+        self.address: Optional[str] = None
+        self.requests = 0
+        self.connections = 0
+        self.updated = time.monotonic()
+        self.keepalive_task: Optional[asyncio.Task[None]] = None
+
+    async def send(self, request: Request, **kwargs: Any) -> Response:
+        if self.address is not None and request.url.host == self.host:
+            # Host header was set from the original url, TLS keeps the name
+            request.url = request.url.copy_with(host=self.address)
+            request.extensions["sni_hostname"] = self.host
+        request.extensions["trace"] = ClientTrace(
+            self, request.extensions.get("trace")
+        )
+        self.requests += 1
+        self.updated = time.monotonic()
+        try:
+            return await super().send(request, **kwargs)
+        except (ConnectError, ConnectTimeout):
+            # the address may be gone, go by name until resolved again
+            self.address = None
+            raise
+
+    async def resolve(self) -> Optional[str]:
+        if not self.host:
+            return None
+        port = self.base_url.port or (
+            443 if self.base_url.scheme == "https" else 80
+        )
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                self.host, port, type=socket.SOCK_STREAM
+            )
+        except OSError:
+            self.address = None
+            raise
+        addresses = [str(info[4][0]) for info in infos]
+        # keep the current address while it is listed, its pooled
+        # connections stay usable
+        if self.address not in addresses:
+            self.address = addresses[0] if addresses else None
+        return self.address
+
+    async def probe(self) -> bool:
+        try:
+            await rate_limit(self, "/")
+            await self.head("/")
+        except (HTTPError, OSError) as e:
+            logger.error("\n{}\n{}", self.base_url, e)
+            return False
+        return True
+
+    async def warmup(self, connections: Optional[int] = None) -> int:
+        # resolve, then open the keep-alive pool before it is needed
+        try:
+            await self.resolve()
+        except OSError as e:
+            logger.error("\n{}\n{}", self.host, e)
+        n = self.pool_size if connections is None else connections
+        ok = await asyncio.gather(*[self.probe() for _ in range(n)])
+        return sum(ok)
+
+    async def warmup_at(
+        self,
+        at: float,
+        connections: Optional[int] = None,
+    ) -> int:
+        # at is a time.time() timestamp, e.g. a few seconds before the open
+        await asyncio.sleep(max(0, at - time.time()))
+        return await self.warmup(connections)
+
+    async def keepalive(self, interval: Optional[float] = None) -> None:
+        if interval is None:
+            interval = (self.keepalive_expiry or 10) / 2
+        while True:
+            idle = time.monotonic() - self.updated
+            if idle >= interval:
+                # re-resolves, then concurrent probes touch every pooled
+                # connection
+                await self.warmup()
+                idle = 0
+            await asyncio.sleep(interval - idle)
+
+    def start_keepalive(self, interval: Optional[float] = None) -> None:
+        if self.keepalive_task is None:
+            self.keepalive_task = asyncio.create_task(self.keepalive(interval))
+
+    async def stop_keepalive(self) -> None:
+        task = self.keepalive_task
+        if task is not None:
+            self.keepalive_task = None
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def aclose(self) -> None:
+        await self.stop_keepalive()
+        await super().aclose()
+
+    def stats(self) -> dict[str, float]:
+        reused = self.requests - self.connections
+        return {
+            "requests": self.requests,
+            "connections": self.connections,
+            "reused": reused,
+            "reuse_ratio": reused / self.requests if self.requests else 0,
+        }
+
 
 def websocket_connect(
     uri: str,
@@ -16,15 +226,27 @@ def websocket_connect(
 def http_client(
     base_url: str = "",
     timeout: Optional[float] = None,
+    limiter: Optional[RateLimiter] = None,
+    limits: Limits = LIMITS,
+    http2: bool = False,
 ) -> AsyncClient:
-    return AsyncClient(base_url=base_url, timeout=timeout)
+    return HTTPClient(base_url, timeout, limiter, limits, http2)
+
+
+def endpoint(url_path: str, headers: dict[str, Any]) -> str:
+    return str(headers.get("tr_id") or url_path)
+
+
+async def rate_limit(client: AsyncClient, key: str) -> None:
+    if isinstance(client, HTTPClient) and client.limiter is not None:
+        await client.limiter.acquire(key)
 
 
 def response_processing(
     r: Response,
     url_path: str,
     headers: dict[str, Any],
-    data: dict[str, Any],
+    data: Any,
     debug: bool,
 ) -> tuple[Headers, dict[str, Any]]:
     rheaders = r.headers
@@ -34,12 +256,58 @@ def response_processing(
         rdata = {}
     if r.status_code != codes.OK:
         logger.error(
-            "\n%s\n%s\n%s\n%s\n%s\n%s"
-            % (url_path, headers, data, r, rheaders, rdata)
+            "\n{}\n{}\n{}\n{}\n{}\n{}",
+            url_path,
+            headers,
+            data,
+            r,
+            rheaders,
+            rdata,
         )
         rdata = {}
     elif debug:
-        logger.debug("\n%s\n%s\n%s" % (url_path, data, rdata))
+        logger.debug("\n{}\n{}\n{}", url_path, data, rdata)
+    return rheaders, rdata
+
+
+async def request(
+    client: AsyncClient,
+    method: str,
+    url_path: str,
+    headers: dict[str, Any],
+    data: Any,
+    sleep: float,
+    debug: bool,
+    **kwargs: Any,
+) -> tuple[Headers, dict[str, Any]]:
+    key = endpoint(url_path, headers)
+    await rate_limit(client, key)
+    t = time.perf_counter()
+    elapsed: Optional[float] = None
+    status_code = 0
+    rdata: dict[str, Any] = {}
+    ok = False
+    try:
+        r = await client.request(
+            method,
+            url_path,
+            headers=headers,
+            extensions=metrics.extensions(key),
+            **kwargs,
+        )
+        elapsed = time.perf_counter() - t
+        status_code = r.status_code
+        rheaders, rdata = response_processing(
+            r, url_path, headers, data, debug
+        )
+        ok = True
+    finally:
+        # also timeouts and bodies that don't parse
+        if elapsed is None:
+            elapsed = time.perf_counter() - t
+        metrics.record(key, elapsed, status_code, rdata, not ok)
+    if sleep > 0:
+        await asyncio.sleep(sleep)
     return rheaders, rdata
 
 
@@ -51,14 +319,9 @@ async def get(
     sleep: float,
     debug: bool,
 ) -> tuple[Headers, dict[str, Any]]:
-    r = await client.get(
-        url_path,
-        headers=headers,
-        params=data,
+    return await request(
+        client, "GET", url_path, headers, data, sleep, debug, params=data
     )
-    if sleep > 0:
-        await asyncio.sleep(sleep)
-    return response_processing(r, url_path, headers, data, debug)
 
 
 async def post(
@@ -69,11 +332,26 @@ async def post(
     sleep: float,
     debug: bool,
 ) -> tuple[Headers, dict[str, Any]]:
-    r = await client.post(
+    return await request(
+        client, "POST", url_path, headers, data, sleep, debug, json=data
+    )
+
+
+async def post_content(
+    client: AsyncClient,
+    url_path: str,
+    headers: dict[str, Any],
+    content: bytes,
+    sleep: float,
+    debug: bool,
+) -> tuple[Headers, dict[str, Any]]:
+    return await request(
+        client,
+        "POST",
         url_path,
-        headers=headers,
-        json=data,
+        headers,
+        content,
+        sleep,
+        debug,
+        content=content,
     )
-    if sleep > 0:
-        await asyncio.sleep(sleep)
-    return response_processing(r, url_path, headers, data, debug)
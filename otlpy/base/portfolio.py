@@ -0,0 +1,105 @@
+from typing import Any
+
+import numpy as np
+
+from otlpy.base.account import Inventory
+
+Array = np.ndarray[Any, Any]
+
+
+class Portfolio:
+    def __init__(
+        self,
+        tickers: list[str],
+        unit: Any = 1,
+        cost: Any = 0,
+    ) -> None:
+        n = len(tickers)
+        self.tickers = list(tickers)
+        self.index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.unit = np.full(n, unit, dtype=np.float64)
+        self.cost = np.full(n, cost, dtype=np.float64)
+        self.pos = np.zeros(n)
+        self.price = np.zeros(n)
+        self.realized_pnl = np.zeros(n)
+        self.realized_cost = np.zeros(n)
+
+    @classmethod
+    def from_inventories(cls, inventories: list[Inventory]) -> "Portfolio":
+        portfolio = cls(
+            [inv.ticker for inv in inventories],
+            [inv.unit for inv in inventories],
+            [inv.cost for inv in inventories],
+        )
+        portfolio.load(inventories)
+        return portfolio
+
+    def load(self, inventories: list[Inventory]) -> None:
+        for inv in inventories:
+            i = self.index[inv.ticker]
+            self.pos[i] = inv.pos
+            self.price[i] = inv.price
+            self.realized_pnl[i] = inv.realized_pnl
+            self.realized_cost[i] = inv.realized_cost
+
+    def store(self, inventories: list[Inventory]) -> None:
+        for inv in inventories:
+            i = self.index[inv.ticker]
+            inv.pos = float(self.pos[i])
+            inv.price = float(self.price[i])
+            inv.realized_pnl = float(self.realized_pnl[i])
+            inv.realized_cost = float(self.realized_cost[i])
+
+    def indices(self, tickers: list[str]) -> Array:
+        return np.array([self.index[t] for t in tickers], dtype=np.intp)
+
+    def unrealized_pnl(self, prices: Array) -> Array:
+        pnl: Array = (prices - self.price) * self.pos * self.unit
+        return pnl
+
+    def total_pnl(self, prices: Array) -> Array:
+        pnl: Array = (
+            self.realized_pnl
+            - self.realized_cost
+            + self.unrealized_pnl(prices)
+        )
+        return pnl
+
+    def mark(self, prices: Array) -> float:
+        return float(self.total_pnl(prices).sum())
+
+    def filled_position(self, i: Array, pos: Array, price: Array) -> None:
+        # Inventory.filled_position for distinct indices i
+        cur = self.pos[i]
+        cur_price = self.price[i]
+        unit = self.unit[i]
+        new = cur + pos
+        same = cur * pos > 0
+        reduce = ~same & (np.abs(pos) <= np.abs(cur))
+        flip = ~same & ~reduce
+        avg = np.divide(
+            cur_price * cur + price * pos,
+            new,
+            out=np.zeros_like(new),
+            where=same,
+        )
+        self.price[i] = np.where(same, avg, np.where(reduce, cur_price, price))
+        self.realized_pnl[i] += np.where(
+            reduce,
+            (cur_price - price) * pos * unit,
+            np.where(flip, (price - cur_price) * cur * unit, 0),
+        )
+        self.pos[i] = new
+        self.realized_cost[i] += np.abs(new) * price * unit * self.cost[i]
+
+    def apply_fills(self, i: Array, pos: Array, price: Array) -> None:
+        # fills for the same ticker are applied in order, one per round
+        i = np.asarray(i, dtype=np.intp)
+        pos = np.asarray(pos, dtype=np.float64)
+        price = np.asarray(price, dtype=np.float64)
+        while len(i):
+            _, first = np.unique(i, return_index=True)
+            self.filled_position(i[first], pos[first], price[first])
+            rest = np.ones(len(i), dtype=bool)
+            rest[first] = False
+            i, pos, price = i[rest], pos[rest], price[rest]
@@ -0,0 +1,174 @@
+import math
+import time
+from enum import Enum, auto
+from typing import Any, Optional
+
+import numpy as np
+
+from otlpy.base import market
+from otlpy.base.account import Cancel, Inventory, Order, Replace
+
+Array = np.ndarray[Any, Any]
+
+
+class REJECT(Enum):
+    TICKER = auto()
+    POSITION = auto()
+    NOTIONAL = auto()
+    PRICE_BAND = auto()
+    RATE = auto()
+
+
+class RiskEngine:
+    def __init__(
+        self,
+        tickers: list[str],
+        inventories: dict[str, Inventory],
+        max_position: Any = math.inf,
+        max_notional: Any = math.inf,
+        band: Any = math.inf,
+        rate: Any = math.inf,
+        burst: Any = 1,
+    ) -> None:
+        # limits are per ticker arrays, scalars are broadcast
+        n = len(tickers)
+        self.tickers = list(tickers)
+        self.index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.inventories = inventories
+        self.max_position = np.full(n, max_position, dtype=np.float64)
+        self.max_notional = np.full(n, max_notional, dtype=np.float64)
+        # fraction of the last trade price a limit price may deviate
+        self.band = np.full(n, band, dtype=np.float64)
+        # orders per second per ticker, as a token bucket
+        self.rate = np.full(n, rate, dtype=np.float64)
+        self.burst = np.full(n, burst, dtype=np.float64)
+        self.tokens = self.burst.copy()
+        self.updated = np.full(n, time.monotonic())
+        self.last = np.zeros(n)
+        self.rejects = {r: 0 for r in REJECT}
+        # new orders passed here, with the price their notional is taken
+        # at, until they close. In flight until release() is called.
+        self.orders: list[dict[Order, float]] = [{} for _ in range(n)]
+        self.inflight: set[Order] = set()
+
+    def on_price(self, price: market.Price) -> None:
+        i = self.index.get(price.ticker)
+        if i is not None:
+            self.last[i] = price.trade.price
+
+    def mark(self, indices: Array, prices: Array) -> None:
+        # columnar trades, e.g. realtime.trade_columns
+        self.last[indices] = prices
+
+    def check(self, order: Order) -> Optional[REJECT]:
+        if isinstance(order, Cancel):
+            return None
+        i = self.index.get(order.ticker)
+        if i is None:
+            reject: Optional[REJECT] = REJECT.TICKER
+        else:
+            reject = self.check_price(i, order)
+            if reject is None and not isinstance(order, Replace):
+                reject = self.check_exposure(i, order)
+            if reject is None:
+                reject = self.take(i)
+            if reject is None and not isinstance(order, Replace):
+                self.orders[i][order] = self.notional_price(i, order)
+                self.inflight.add(order)
+        if reject is not None:
+            self.rejects[reject] += 1
+        return reject
+
+    def release(self, order: Order) -> None:
+        # after the broker acked or rejected it, or the request failed
+        self.inflight.discard(order)
+        if order.opened <= 0:
+            i = self.index.get(order.ticker)
+            if i is not None:
+                self.orders[i].pop(order, None)
+
+    def notional_price(self, i: int, order: Order) -> float:
+        if order.otype == market.ORDER_TYPE.LIMIT:
+            return order.price
+        return float(self.last[i])
+
+    def exposure(
+        self, i: int, inventory: Optional[Inventory]
+    ) -> tuple[float, float, float]:
+        # open buy qty, sell qty and notional, orders passed here at their
+        # own price, the rest of the inventory's open qty at the last price
+        buy = sell = notional = 0.0
+        booked_buy = booked_sell = 0.0
+        orders = self.orders[i]
+        for order, price in list(orders.items()):
+            if order in self.inflight:
+                qty = order.qty
+            elif order.opened > 0:
+                qty = order.opened
+            else:
+                del orders[order]
+                continue
+            booked = inventory is not None and order.uid in inventory.orders
+            if order.oside == market.ORDER_SIDE.BUY:
+                buy += qty
+                booked_buy += qty if booked else 0
+            else:
+                sell += qty
+                booked_sell += qty if booked else 0
+            notional += qty * price
+        if inventory is not None:
+            untracked_buy = max(inventory.opened_buy - booked_buy, 0)
+            untracked_sell = max(inventory.opened_sell - booked_sell, 0)
+            buy += untracked_buy
+            sell += untracked_sell
+            notional += (untracked_buy + untracked_sell) * float(self.last[i])
+        return buy, sell, notional
+
+    def check_price(self, i: int, order: Order) -> Optional[REJECT]:
+        last = float(self.last[i])
+        if order.otype == market.ORDER_TYPE.LIMIT:
+            if last > 0 and abs(order.price - last) > self.band[i] * last:
+                return REJECT.PRICE_BAND
+        elif not last and self.band[i] < math.inf:
+            return REJECT.PRICE_BAND
+        return None
+
+    def check_exposure(self, i: int, order: Order) -> Optional[REJECT]:
+        inventory = self.inventories.get(order.ticker)
+        pos = 0.0
+        unit = 1.0
+        if inventory is not None:
+            pos = inventory.pos
+            unit = inventory.unit
+        opened_buy, opened_sell, notional = self.exposure(i, inventory)
+        # position if every open order on this side fills
+        if order.oside == market.ORDER_SIDE.BUY:
+            worst = pos + opened_buy + order.qty
+        else:
+            worst = opened_sell + order.qty - pos
+        if worst > self.max_position[i]:
+            return REJECT.POSITION
+        price = self.notional_price(i, order)
+        if order.otype != market.ORDER_TYPE.LIMIT and not price:
+            # without a last trade a market order's notional is unbounded
+            if self.max_notional[i] < math.inf:
+                return REJECT.NOTIONAL
+        if (notional + order.qty * price) * unit > self.max_notional[i]:
+            return REJECT.NOTIONAL
+        return None
+
+    def take(self, i: int) -> Optional[REJECT]:
+        rate = float(self.rate[i])
+        if rate == math.inf:
+            return None
+        now = time.monotonic()
+        tokens = min(
+            float(self.burst[i]),
+            float(self.tokens[i]) + (now - float(self.updated[i])) * rate,
+        )
+        self.updated[i] = now
+        if tokens < 1:
+            self.tokens[i] = tokens
+            return REJECT.RATE
+        self.tokens[i] = tokens - 1
+        return None
@@ -0,0 +1,210 @@
+import json
+import os
+import time
+from typing import Any, Optional, Union
+
+import numpy as np
+
+from otlpy.base.lob import ASK, BID, LEVELS, PRICE, QTY, ArrayBook
+from otlpy.base.market import LimitOrderBook, Price
+
+Array = np.ndarray[Any, Any]
+
+TRADE = "trade"
+BOOK = "book"
+
+TRADE_DTYPE = np.dtype(
+    [
+        ("recv", "<i8"),
+        ("time", "<i4"),
+        ("ticker", "S12"),
+        ("price", "<f8"),
+        ("qty", "<f8"),
+        ("bid", "<f8"),
+        ("bid_qty", "<f8"),
+        ("ask", "<f8"),
+        ("ask_qty", "<f8"),
+    ]
+)
+
+BOOK_DTYPE = np.dtype(
+    [
+        ("recv", "<i8"),
+        ("time", "<i4"),
+        ("ticker", "S12"),
+        ("bid", "<f8", (LEVELS,)),
+        ("bid_qty", "<f8", (LEVELS,)),
+        ("ask", "<f8", (LEVELS,)),
+        ("ask_qty", "<f8", (LEVELS,)),
+    ]
+)
+
+DTYPES = {TRADE: TRADE_DTYPE, BOOK: BOOK_DTYPE}
+
+
+def segment_path(root: str, yyyymmdd: str, kind: str) -> str:
+    return os.path.join(root, "%s.%s.bin" % (yyyymmdd, kind))
+
+
+def index_path(root: str, yyyymmdd: str, kind: str) -> str:
+    return os.path.join(root, "%s.%s.idx" % (yyyymmdd, kind))
+
+
+def build_index(records: Array, block_size: int) -> dict[str, Any]:
+    blocks = []
+    tickers: dict[str, list[int]] = {}
+    for b, start in enumerate(range(0, len(records), block_size)):
+        block = records[start : start + block_size]
+        blocks.append(
+            [
+                start,
+                len(block),
+                int(block["recv"][0]),
+                int(block["recv"][-1]),
+            ]
+        )
+        for ticker in np.unique(block["ticker"]):
+            tickers.setdefault(ticker.decode(), []).append(b)
+    return {"block_size": block_size, "blocks": blocks, "tickers": tickers}
+
+
+class TickWriter:
+    def __init__(
+        self,
+        root: str,
+        yyyymmdd: str,
+        kind: str,
+        block_size: int = 4096,
+    ) -> None:
+        self.root = root
+        self.yyyymmdd = yyyymmdd
+        self.kind = kind
+        self.block_size = block_size
+        self.buffer = np.zeros(block_size, dtype=DTYPES[kind])
+        self.n = 0
+        os.makedirs(root, exist_ok=True)
+        path = segment_path(root, yyyymmdd, kind)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        # drop a torn record left by a crash mid-write
+        size = os.fstat(fd).st_size
+        os.ftruncate(fd, size - size % self.buffer.itemsize)
+        self.f = os.fdopen(fd, "ab")
+
+    def next(self) -> int:
+        if self.n == self.block_size:
+            self.flush()
+        n = self.n
+        self.n += 1
+        return n
+
+    def write_price(self, price: Price, recv: Optional[int] = None) -> None:
+        bid = price.bid
+        ask = price.ask
+        self.buffer[self.next()] = (
+            time.time_ns() if recv is None else recv,
+            int(price.timestamp or 0),
+            price.ticker.encode(),
+            price.trade.price,
+            price.trade.qty,
+            0 if bid is None else bid.price,
+            0 if bid is None else bid.qty,
+            0 if ask is None else ask.price,
+            0 if ask is None else ask.qty,
+        )
+
+    def write_book(
+        self,
+        book: Union[LimitOrderBook, ArrayBook],
+        recv: Optional[int] = None,
+    ) -> None:
+        if isinstance(book, LimitOrderBook):
+            book = ArrayBook.from_limitorderbook(book)
+        r = self.buffer[self.next()]
+        r["recv"] = time.time_ns() if recv is None else recv
+        r["time"] = int(book.timestamp or 0)
+        r["ticker"] = book.ticker.encode()
+        levels = min(LEVELS, book.data.shape[-1])
+        r["bid"][:levels] = book.data[BID, PRICE, :levels]
+        r["bid_qty"][:levels] = book.data[BID, QTY, :levels]
+        r["ask"][:levels] = book.data[ASK, PRICE, :levels]
+        r["ask_qty"][:levels] = book.data[ASK, QTY, :levels]
+
+    def flush(self) -> None:
+        if self.n > 0:
+            self.f.write(self.buffer[: self.n].tobytes())
+            self.buffer[: self.n] = 0
+            self.n = 0
+        self.f.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self.f.close()
+        reader = TickReader(self.root, self.yyyymmdd, self.kind, False)
+        reader.save_index(self.block_size)
+
+
+class TickReader:
+    def __init__(
+        self,
+        root: str,
+        yyyymmdd: str,
+        kind: str,
+        load_index: bool = True,
+    ) -> None:
+        self.root = root
+        self.yyyymmdd = yyyymmdd
+        self.kind = kind
+        path = segment_path(root, yyyymmdd, kind)
+        dtype = DTYPES[kind]
+        self.records: Array
+        # whole records only, a writer may be mid-record
+        n = os.path.getsize(path) // dtype.itemsize
+        if not n:
+            self.records = np.zeros(0, dtype=dtype)
+        else:
+            self.records = np.memmap(path, dtype=dtype, mode="r", shape=(n,))
+        self.index: dict[str, Any] = {}
+        if load_index:
+            self.load_index()
+
+    def save_index(self, block_size: int = 4096) -> None:
+        self.index = build_index(self.records, block_size)
+        path = index_path(self.root, self.yyyymmdd, self.kind)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+
+    def load_index(self) -> None:
+        try:
+            with open(
+                index_path(self.root, self.yyyymmdd, self.kind),
+                encoding="utf-8",
+            ) as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.save_index()
+            return
+        blocks = self.index["blocks"]
+        if not blocks or sum(blocks[-1][:2]) != len(self.records):
+            # the segment grew after the index was written
+            self.save_index(self.index["block_size"])
+
+    def between(self, start: int, end: int) -> Array:
+        recv = self.records["recv"]
+        lo = int(np.searchsorted(recv, start, "left"))
+        hi = int(np.searchsorted(recv, end, "left"))
+        between: Array = self.records[lo:hi]
+        return between
+
+    def ticker(self, ticker: str) -> Array:
+        key = ticker.encode()
+        parts = []
+        for b in self.index["tickers"].get(ticker, []):
+            start, count, _, _ = self.index["blocks"][b]
+            block = self.records[start : start + count]
+            parts.append(block[block["ticker"] == key])
+        if not parts:
+            return np.zeros(0, dtype=self.records.dtype)
+        return np.concatenate(parts)
+
+    def tickers(self) -> list[str]:
+        return list(self.index["tickers"])
@@ -1,8 +1,10 @@
+import json
+import time
 from typing import Any
 
 from httpx import AsyncClient
 
-from otlpy.base.net import post
+from otlpy.base.net import RateLimiter, post, post_content
 from otlpy.kis.settings import Settings
 
 
@@ -12,7 +14,21 @@ class Common:
         self.url_base = "https://openapi.koreainvestment.com:9443"
         self.url_ws = "ws://ops.koreainvestment.com:21000"
         self.authorization = ""
+        self.authorization_expires: float = 0
         self.content_type = "application/json; charset=UTF-8"
+        self.use_hashkey = False
+        self.hashkeys: dict[bytes, str] = {}
+        self.hashkeys_size = 4096
+        # per tr_id headers, valid while authorization is unchanged
+        self.headers_cache: dict[str, dict[str, str]] = {}
+        self.headers_authorization = ""
+
+    def rate_limiter(
+        self,
+        rate: float = 20,
+        burst: float = 20,
+    ) -> RateLimiter:
+        return RateLimiter(rate, burst, {"/oauth2/tokenP": (1 / 60, 1)})
 
     def headers1(self) -> dict[str, str]:
         return {
@@ -34,6 +50,19 @@ class Common:
             "authorization": self.authorization,
         }
 
+    def headers_tr(self, tr_id: str) -> dict[str, str]:
+        # shared mapping, copy before adding per-request fields
+        if self.headers_authorization != self.authorization:
+            self.headers_cache.clear()
+            self.headers_authorization = self.authorization
+        headers = self.headers_cache.get(tr_id)
+        if headers is None:
+            headers = self.headers_cache[tr_id] = {
+                **self.headers4(),
+                "tr_id": tr_id,
+            }
+        return headers
+
     async def hash(
         self,
         client: AsyncClient,
@@ -41,10 +70,33 @@ class Common:
         sleep: float,
         debug: bool,
     ) -> str:
+        # the bytes httpx sends for json=data
+        content = json.dumps(
+            data, ensure_ascii=False, separators=(",", ":"), allow_nan=False
+        ).encode()
+        return await self.hash_content(client, content, sleep, debug)
+
+    async def hash_content(
+        self,
+        client: AsyncClient,
+        content: bytes,
+        sleep: float,
+        debug: bool,
+    ) -> str:
+        # the hashkey is over the exact request body
+        hashkey = self.hashkeys.get(content)
+        if hashkey is not None:
+            return hashkey
         url_path = "/uapi/hashkey"
         headers = self.headers3()
-        _, rdata = await post(client, url_path, headers, data, sleep, debug)
-        return str(rdata["HASH"])
+        _, rdata = await post_content(
+            client, url_path, headers, content, sleep, debug
+        )
+        hashkey = str(rdata["HASH"])
+        if len(self.hashkeys) >= self.hashkeys_size:
+            del self.hashkeys[next(iter(self.hashkeys))]
+        self.hashkeys[content] = hashkey
+        return hashkey
 
     async def token(
         self,
@@ -64,3 +116,4 @@ class Common:
             rdata["token_type"],
             rdata["access_token"],
         )
+        self.authorization_expires = time.time() + float(rdata["expires_in"])
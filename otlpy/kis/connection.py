@@ -0,0 +1,164 @@
+import asyncio
+import json
+import random
+from typing import AsyncIterator, Optional
+
+from loguru import logger
+from websockets.exceptions import WebSocketException
+from websockets.legacy.client import WebSocketClientProtocol
+
+from otlpy.base.net import websocket_connect
+from otlpy.kis.domestic_stock import DomesticStock
+from otlpy.kis.realtime import (
+    TR_ID_EXECUTION,
+    TR_ID_ORDERBOOK,
+    TR_ID_PINGPONG,
+    TR_ID_TRADE,
+    is_control,
+)
+
+MAX_SUBSCRIPTIONS = 41
+
+Subscription = tuple[str, str]
+
+
+class Shard:
+    def __init__(self, n: int) -> None:
+        self.n = n
+        self.subscriptions: set[Subscription] = set()
+        self.ws: Optional[WebSocketClientProtocol] = None
+        self.task: Optional[asyncio.Task[None]] = None
+
+
+class ConnectionManager:
+    def __init__(
+        self,
+        domestic_stock: DomesticStock,
+        max_shards: int = 4,
+        capacity: int = MAX_SUBSCRIPTIONS,
+        backoff: float = 0.5,
+        backoff_max: float = 30,
+        queue_size: int = 0,
+    ) -> None:
+        self.domestic_stock = domestic_stock
+        self.url = domestic_stock.common.url_ws
+        self.max_shards = max_shards
+        self.capacity = capacity
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.shards: list[Shard] = []
+        self.queue: asyncio.Queue[str] = asyncio.Queue(queue_size)
+        self.running = False
+
+    def shard(self, subscription: Subscription) -> Optional[Shard]:
+        for shard in self.shards:
+            if subscription in shard.subscriptions:
+                return shard
+        return None
+
+    async def send(
+        self,
+        shard: Shard,
+        subscription: Subscription,
+        subscribe: bool,
+    ) -> None:
+        if shard.ws is None:
+            # sent on (re)connect
+            return
+        try:
+            await shard.ws.send(
+                self.domestic_stock.ws_senddata(subscribe, *subscription)
+            )
+        except WebSocketException as e:
+            logger.error("\n%s\n%s\n%s" % (self.url, subscription, e))
+
+    async def subscribe(self, tr_id: str, tr_key: str) -> bool:
+        subscription = (tr_id, tr_key)
+        if self.shard(subscription) is not None:
+            return True
+        shards = [
+            s for s in self.shards if len(s.subscriptions) < self.capacity
+        ]
+        if shards:
+            shard = min(shards, key=lambda s: len(s.subscriptions))
+        elif len(self.shards) < self.max_shards:
+            shard = Shard(len(self.shards))
+            self.shards.append(shard)
+            if self.running:
+                shard.task = asyncio.create_task(self.run(shard))
+        else:
+            logger.error("\n%s\n%s\n%s" % (self.url, subscription, "full"))
+            return False
+        shard.subscriptions.add(subscription)
+        await self.send(shard, subscription, True)
+        return True
+
+    async def unsubscribe(self, tr_id: str, tr_key: str) -> None:
+        subscription = (tr_id, tr_key)
+        shard = self.shard(subscription)
+        if shard is None:
+            return
+        shard.subscriptions.discard(subscription)
+        await self.send(shard, subscription, False)
+
+    async def subscribe_trade(self, ticker: str) -> bool:
+        return await self.subscribe(TR_ID_TRADE, ticker)
+
+    async def subscribe_orderbook(self, ticker: str) -> bool:
+        return await self.subscribe(TR_ID_ORDERBOOK, ticker)
+
+    async def subscribe_execution(self) -> bool:
+        return await self.subscribe(
+            TR_ID_EXECUTION, self.domestic_stock.settings.kis_account_htsid
+        )
+
+    async def connected(
+        self,
+        shard: Shard,
+        ws: WebSocketClientProtocol,
+    ) -> None:
+        shard.ws = ws
+        for subscription in list(shard.subscriptions):
+            await ws.send(self.domestic_stock.ws_senddata(True, *subscription))
+        async for frame in ws:
+            if isinstance(frame, bytes):
+                frame = frame.decode()
+            if is_control(frame) and TR_ID_PINGPONG in frame:
+                if json.loads(frame)["header"]["tr_id"] == TR_ID_PINGPONG:
+                    await ws.send(frame)
+                    continue
+            await self.queue.put(frame)
+
+    async def run(self, shard: Shard) -> None:
+        backoff = self.backoff
+        while self.running:
+            try:
+                async with websocket_connect(self.url) as ws:
+                    backoff = self.backoff
+                    await self.connected(shard, ws)
+            except (OSError, WebSocketException) as e:
+                logger.error("\n%s\n%d\n%s" % (self.url, shard.n, e))
+            shard.ws = None
+            if not self.running:
+                return
+            await asyncio.sleep(backoff * random.uniform(0.5, 1.5))
+            backoff = min(backoff * 2, self.backoff_max)
+
+    def start(self) -> None:
+        self.running = True
+        for shard in self.shards:
+            if shard.task is None:
+                shard.task = asyncio.create_task(self.run(shard))
+
+    async def stop(self) -> None:
+        self.running = False
+        tasks = [s.task for s in self.shards if s.task is not None]
+        for shard in self.shards:
+            if shard.task is not None:
+                shard.task.cancel()
+                shard.task = None
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def stream(self) -> AsyncIterator[str]:
+        while True:
+            yield await self.queue.get()
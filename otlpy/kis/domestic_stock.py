@@ -1,18 +1,53 @@
-from typing import Any, Union
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Iterable, Optional, Union
 
-from httpx import AsyncClient
+from httpx import AsyncClient, HTTPError
 from loguru import logger
 
-from otlpy.base.account import Buy, Cancel, Order, Replace, Sell
+from otlpy.base.account import Book, Buy, Cancel, Order, Replace, Sell
+from otlpy.base.journal import Journal
+from otlpy.base.lob import PRICE, QTY, ArrayBook
 from otlpy.base.market import ORDER_SIDE, ORDER_TYPE
-from otlpy.base.net import get, post
+from otlpy.base.net import get, post_content
+from otlpy.base.risk import RiskEngine
 from otlpy.kis.common import Common
 
 
+def plain(field: str) -> str:
+    # spliced into the JSON templates unescaped
+    if field and not (field.isascii() and field.isalnum()):
+        raise ValueError(field)
+    return field
+
+
 class DomesticStock:
     def __init__(self, common: Common) -> None:
         self.common = common
         self.settings = common.settings
+        self.keep_rdata = True
+        self.risk: Optional[RiskEngine] = None
+        self.journal: Optional[Journal] = None
+        account = '"CANO":%s,"ACNT_PRDT_CD":%s,' % (
+            json.dumps(self.settings.kis_account_cano_domestic_stock),
+            json.dumps(self.settings.kis_account_prdt_domestic_stock),
+        )
+        account = account.replace("%", "%%")
+        # request bodies with slots for the per-order fields
+        self.order_cash_template = (
+            "{"
+            + account
+            + '"PDNO":"%s","ORD_DVSN":"%s","ORD_QTY":"%d","ORD_UNPR":"%d"}'
+        )
+        self.order_rvsecncl_template = (
+            "{"
+            + account
+            + '"KRX_FWDG_ORD_ORGNO":"%s","ORGN_ODNO":"%s","ORD_DVSN":"%s",'
+            + '"RVSE_CNCL_DVSN_CD":"%s","ORD_QTY":"%d","ORD_UNPR":"%d",'
+            + '"QTY_ALL_ORD_YN":"Y"}'
+        )
+        self.senddata: dict[tuple[bool, str, str], str] = {}
 
     def order_type(self, order_type: ORDER_TYPE) -> str:
         if order_type == ORDER_TYPE.LIMIT:
@@ -23,6 +58,75 @@ class DomesticStock:
             assert False
         return s
 
+    async def order_headers(
+        self,
+        client: AsyncClient,
+        tr_id: str,
+        content: bytes,
+    ) -> dict[str, str]:
+        headers = self.common.headers_tr(tr_id)
+        if self.common.use_hashkey:
+            hashkey = await self.common.hash_content(client, content, 0, False)
+            headers = {**headers, "hashkey": hashkey}
+        return headers
+
+    def order_cash_content(self, order: Order) -> bytes:
+        return (
+            self.order_cash_template
+            % (
+                plain(order.ticker),
+                self.order_type(order.otype),
+                order.qty,
+                order.price,
+            )
+        ).encode()
+
+    def order_rvsecncl_content(self, order: Union[Cancel, Replace]) -> bytes:
+        if isinstance(order, Cancel):
+            omsg = "02"
+        else:
+            omsg = "01"
+        return (
+            self.order_rvsecncl_template
+            % (
+                plain(order.origin.orgno),
+                plain(order.origin.uid),
+                self.order_type(order.otype),
+                omsg,
+                order.qty,
+                order.price,
+            )
+        ).encode()
+
+    def risk_check(self, url_path: str, order: Order) -> bool:
+        if self.risk is None:
+            return True
+        reject = self.risk.check(order)
+        if reject is None:
+            return True
+        logger.error(
+            "\n%s\n%s\n%s"
+            % (
+                url_path,
+                (order.ticker, order.oside, order.qty, order.price),
+                reject,
+            )
+        )
+        return False
+
+    def risk_release(self, order: Order) -> None:
+        if self.risk is not None:
+            self.risk.release(order)
+
+    def journal_submitted(self, order: Order) -> int:
+        if self.journal is None:
+            return 0
+        return self.journal.submitted(order)
+
+    def journal_acked(self, sid: int, order: Order) -> None:
+        if self.journal is not None:
+            self.journal.acked(sid, order)
+
     async def new_order(
         self,
         client: AsyncClient,
@@ -42,26 +146,39 @@ class DomesticStock:
         else:
             assert False
         url_path = "/uapi/domestic-stock/v1/trading/order-cash"
-        data = {
-            "CANO": self.settings.kis_account_cano_domestic_stock,
-            "ACNT_PRDT_CD": self.settings.kis_account_prdt_domestic_stock,
-            "PDNO": order.ticker,
-            "ORD_DVSN": self.order_type(order.otype),
-            "ORD_QTY": str(int(order.qty)),
-            "ORD_UNPR": str(int(order.price)),
-        }
-        headers = {
-            **self.common.headers4(),
-            "tr_id": tr_id,
-            "hashkey": await self.common.hash(client, data, 0, False),
-        }
-        _, rdata = await post(client, url_path, headers, data, sleep, debug)
+        t0 = time.perf_counter()
+        data = self.order_cash_content(order)
+        if not self.risk_check(url_path, order):
+            return order
+        try:
+            headers = await self.order_headers(client, tr_id, data)
+            t1 = time.perf_counter()
+            sid = self.journal_submitted(order)
+            _, rdata = await post_content(
+                client, url_path, headers, data, sleep, debug
+            )
+        except BaseException:
+            self.risk_release(order)
+            raise
+        if debug:
+            logger.debug(
+                "\n%s\nheaders %.6f\norder %.6f"
+                % (url_path, t1 - t0, time.perf_counter() - t1)
+            )
         if not rdata or rdata["rt_cd"] != "0":
-            logger.error("\n%s\n%s\n%s" % (url_path, data, rdata))
+            logger.error("\n%s\n%s\n%s" % (url_path, data.decode(), rdata))
+            self.risk_release(order)
+            self.journal_acked(sid, order)
             return order
         order.rdata = rdata["output"]
         order.uid = order.rdata["ODNO"]
+        order.orgno = order.rdata["KRX_FWDG_ORD_ORGNO"]
+        if not self.keep_rdata:
+            order.compact()
         order.opened = order.qty
+        # counted by its open qty from here on, not its reservation
+        self.risk_release(order)
+        self.journal_acked(sid, order)
         return order
 
     async def cancel_or_replace_order(
@@ -72,40 +189,88 @@ class DomesticStock:
         debug: bool,
     ) -> Order:
         if isinstance(order, Cancel):
-            omsg = "02"
             order.price = int(0)
         elif isinstance(order, Replace):
-            omsg = "01"
             order.price = int(order.price)
         else:
             assert False
+        order.qty = int(order.qty)
         tr_id = "TTTC0803U"
         url_path = "/uapi/domestic-stock/v1/trading/order-rvsecncl"
-        data = {
-            "CANO": self.settings.kis_account_cano_domestic_stock,
-            "ACNT_PRDT_CD": self.settings.kis_account_prdt_domestic_stock,
-            "KRX_FWDG_ORD_ORGNO": order.origin.rdata["KRX_FWDG_ORD_ORGNO"],
-            "ORGN_ODNO": order.origin.rdata["ODNO"],
-            "ORD_DVSN": self.order_type(order.otype),
-            "RVSE_CNCL_DVSN_CD": omsg,
-            "ORD_QTY": str(int(order.qty)),
-            "ORD_UNPR": str(int(order.price)),
-            "QTY_ALL_ORD_YN": "Y",
-        }
-        headers = {
-            **self.common.headers4(),
-            "tr_id": tr_id,
-            "hashkey": await self.common.hash(client, data, 0, False),
-        }
-        _, rdata = await post(client, url_path, headers, data, sleep, debug)
+        t0 = time.perf_counter()
+        data = self.order_rvsecncl_content(order)
+        if not self.risk_check(url_path, order):
+            return order
+        headers = await self.order_headers(client, tr_id, data)
+        t1 = time.perf_counter()
+        sid = self.journal_submitted(order)
+        _, rdata = await post_content(
+            client, url_path, headers, data, sleep, debug
+        )
+        if debug:
+            logger.debug(
+                "\n%s\nheaders %.6f\norder %.6f"
+                % (url_path, t1 - t0, time.perf_counter() - t1)
+            )
         if not rdata or rdata["rt_cd"] != "0":
-            logger.error("\n%s\n%s\n%s" % (url_path, data, rdata))
+            logger.error("\n%s\n%s\n%s" % (url_path, data.decode(), rdata))
+            self.journal_acked(sid, order)
             return order
         order.rdata = rdata["output"]
         order.uid = order.rdata["ODNO"]
-        order.opened = order.origin.opened
+        order.orgno = order.rdata["KRX_FWDG_ORD_ORGNO"]
+        if not self.keep_rdata:
+            order.compact()
+        if isinstance(order, Replace):
+            # a cancel only closes its origin once confirmed
+            order.opened = order.origin.opened
+        self.journal_acked(sid, order)
         return order
 
+    async def submit(
+        self,
+        client: AsyncClient,
+        order: Order,
+        sleep: float,
+        debug: bool,
+    ) -> Order:
+        if isinstance(order, (Buy, Sell)):
+            return await self.new_order(client, order, sleep, debug)
+        if isinstance(order, (Cancel, Replace)):
+            return await self.cancel_or_replace_order(
+                client, order, sleep, debug
+            )
+        assert False
+
+    async def submit_orders(
+        self,
+        client: AsyncClient,
+        orders: list[Order],
+        concurrency: int,
+        sequential_ticker: bool,
+        sleep: float,
+        debug: bool,
+    ) -> list[Union[Order, BaseException]]:
+        semaphore = asyncio.Semaphore(concurrency)
+        locks: dict[str, asyncio.Lock] = {}
+
+        async def submit(order: Order) -> Order:
+            async with semaphore:
+                return await self.submit(client, order, sleep, debug)
+
+        async def submit_sequential(order: Order) -> Order:
+            # tasks reach the lock in list order and asyncio.Lock is FIFO
+            lock = locks.get(order.ticker)
+            if lock is None:
+                lock = locks[order.ticker] = asyncio.Lock()
+            async with lock:
+                return await submit(order)
+
+        fn = submit_sequential if sequential_ticker else submit
+        return await asyncio.gather(
+            *[fn(order) for order in orders], return_exceptions=True
+        )
+
     async def buy(
         self,
         client: AsyncClient,
@@ -254,19 +419,26 @@ class DomesticStock:
             client, origin, ORDER_TYPE.LIMIT, price, sleep, debug
         )
 
-    async def all_orders(
+    async def iter_all_orders(
         self,
         client: AsyncClient,
         yyyymmdd: str,
         sleep: float,
         debug: bool,
-    ) -> list[Any]:
+        cursor: Optional[tuple[str, str]] = None,
+        inqr_dvsn: str = "00",
+        odno: str = "",
+    ) -> AsyncIterator[tuple[list[Any], Optional[tuple[str, str]]]]:
+        # inqr_dvsn "00" is newest first, "01" oldest first. Only the last
+        # page comes with a None cursor, on an error the pages just stop.
         tr_id = "TTTC8001R"
-        tr_cont = ""
-        ctx_area_fk100 = ""
-        ctx_area_nk100 = ""
+        if cursor is None:
+            tr_cont = ""
+            ctx_area_fk100, ctx_area_nk100 = "", ""
+        else:
+            tr_cont = "N"
+            ctx_area_fk100, ctx_area_nk100 = cursor
         url_path = "/uapi/domestic-stock/v1/trading/inquire-daily-ccld"
-        outlist: list[Any] = []
         while True:
             data = {
                 "CANO": self.settings.kis_account_cano_domestic_stock,
@@ -274,11 +446,11 @@ class DomesticStock:
                 "INQR_STRT_DT": yyyymmdd,
                 "INQR_END_DT": yyyymmdd,
                 "SLL_BUY_DVSN_CD": "00",
-                "INQR_DVSN": "00",
+                "INQR_DVSN": inqr_dvsn,
                 "PDNO": "",
                 "CCLD_DVSN": "00",
                 "ORD_GNO_BRNO": "",
-                "ODNO": "",
+                "ODNO": odno,
                 "INQR_DVSN_3": "",
                 "INQR_DVSN_1": "",
                 "CTX_AREA_FK100": ctx_area_fk100,
@@ -294,13 +466,64 @@ class DomesticStock:
             )
             if not rdata or rdata["rt_cd"] != "0":
                 logger.error("\n%s\n%s\n%s" % (url_path, data, rdata))
-                return outlist
-            outlist = outlist + rdata["output1"]
+                return
             if rheaders["tr_cont"] == "D" or rheaders["tr_cont"] == "E":
-                return outlist
+                yield rdata["output1"], None
+                return
             tr_cont = "N"
             ctx_area_fk100 = rdata["ctx_area_fk100"]
             ctx_area_nk100 = rdata["ctx_area_nk100"]
+            yield rdata["output1"], (ctx_area_fk100, ctx_area_nk100)
+
+    async def iter_all_orders_parsed(
+        self,
+        client: AsyncClient,
+        yyyymmdd: str,
+        sleep: float,
+        debug: bool,
+        cursor: Optional[tuple[str, str]] = None,
+    ) -> AsyncIterator[Order]:
+        async for outlist, _ in self.iter_all_orders(
+            client, yyyymmdd, sleep, debug, cursor
+        ):
+            for record in outlist:
+                yield self.parse_order(record)
+
+    async def all_orders(
+        self,
+        client: AsyncClient,
+        yyyymmdd: str,
+        sleep: float,
+        debug: bool,
+    ) -> list[Any]:
+        outlist: list[Any] = []
+        async for page, _ in self.iter_all_orders(
+            client, yyyymmdd, sleep, debug
+        ):
+            outlist.extend(page)
+        return outlist
+
+    def parse_order(self, record: dict[str, Any]) -> Order:
+        if record["ord_dvsn_cd"] == "01":
+            otype = ORDER_TYPE.MARKET
+        else:
+            otype = ORDER_TYPE.LIMIT
+        ticker = record["pdno"]
+        qty = float(record["ord_qty"])
+        price = float(record["ord_unpr"])
+        order: Order
+        if record["sll_buy_dvsn_cd"] == "02":
+            order = Buy(otype, ticker, qty, price)
+        else:
+            order = Sell(otype, ticker, qty, price)
+        if self.keep_rdata:
+            order.rdata = record
+        order.uid = record["odno"]
+        order.orgno = record["ord_gno_brno"]
+        order.filled = float(record["tot_ccld_qty"])
+        order.filled_price = float(record["avg_prvs"])
+        order.opened = float(record["rmn_qty"])
+        return order
 
     async def limitorderbook(
         self,
@@ -317,17 +540,93 @@ class DomesticStock:
             "FID_COND_MRKT_DIV_CODE": "J",
             "FID_INPUT_ISCD": ticker,
         }
-        headers = {
-            **self.common.headers4(),
-            "tr_id": tr_id,
-        }
+        headers = self.common.headers_tr(tr_id)
         _, rdata = await get(client, url_path, headers, data, sleep, debug)
         if not rdata or rdata["rt_cd"] != "0":
             logger.error("\n%s\n%s\n%s" % (url_path, data, rdata))
             return {}
         return dict(rdata["output1"])
 
+    async def snapshot(
+        self,
+        client: AsyncClient,
+        tickers: Iterable[str],
+        concurrency: int,
+        sleep: float,
+        debug: bool,
+        book: Optional[Book] = None,
+        updated: Optional[dict[str, float]] = None,
+    ) -> AsyncIterator[ArrayBook]:
+        # tickers with open orders first, then the stalest, pacing is left
+        # to the client's rate limiter so the universe refreshes at its rate
+        if updated is None:
+            updated = {}
+        opened = set(book.open_tickers()) if book is not None else set()
+        ordered = sorted(
+            tickers, key=lambda t: (t not in opened, updated.get(t, 0))
+        )
+        pending = iter(ordered)
+        queue: asyncio.Queue[Optional[ArrayBook]] = asyncio.Queue()
+
+        async def worker() -> None:
+            try:
+                for ticker in pending:
+                    try:
+                        rdata = await self.limitorderbook(
+                            client, ticker, sleep, debug
+                        )
+                    except (HTTPError, OSError) as e:
+                        logger.error("\n%s\n%s" % (ticker, e))
+                        continue
+                    if not rdata:
+                        continue
+                    try:
+                        arraybook = self.arraybook(ticker, rdata)
+                    except (KeyError, ValueError) as e:
+                        # a malformed response, the other tickers go on
+                        logger.error("\n%s\n%r\n%s" % (ticker, e, rdata))
+                        continue
+                    updated[ticker] = time.time()
+                    await queue.put(arraybook)
+            finally:
+                await queue.put(None)
+
+        n = max(1, min(concurrency, len(ordered)))
+        tasks = [asyncio.create_task(worker()) for _ in range(n)]
+        try:
+            while n:
+                arraybook = await queue.get()
+                if arraybook is None:
+                    n -= 1
+                else:
+                    yield arraybook
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def arraybook(self, ticker: str, rdata: dict[str, Any]) -> ArrayBook:
+        book = ArrayBook(rdata.get("aspr_acpt_hour", ""), ticker)
+        for i in range(book.data.shape[-1]):
+            book.bid[PRICE, i] = float(rdata["bidp%d" % (i + 1)])
+            book.bid[QTY, i] = float(rdata["bidp_rsqn%d" % (i + 1)])
+            book.ask[PRICE, i] = float(rdata["askp%d" % (i + 1)])
+            book.ask[QTY, i] = float(rdata["askp_rsqn%d" % (i + 1)])
+        return book
+
     def ws_senddata(self, subscribe: bool, tr_id: str, tr_key: str) -> str:
+        key = (subscribe, tr_id, tr_key)
+        senddata = self.senddata.get(key)
+        if senddata is None:
+            senddata = self.senddata[key] = self.ws_senddata_build(*key)
+        return senddata
+
+    def ws_senddata_build(
+        self,
+        subscribe: bool,
+        tr_id: str,
+        tr_key: str,
+    ) -> str:
         if subscribe:
             tr_type = "1"
         else:
@@ -0,0 +1,116 @@
+import json
+import time
+from typing import Optional
+
+from loguru import logger
+
+from otlpy.base.account import Book, Inventory, Order
+from otlpy.base.crypto import AESCBCBase64Decryptor
+from otlpy.base.dispatch import POLICY, Dispatcher
+from otlpy.kis.realtime import (
+    TR_ID_EXECUTION,
+    Execution,
+    decode_execution,
+    is_control,
+    split_frame,
+)
+
+
+class ExecutionPipeline:
+    def __init__(
+        self,
+        book: Book,
+        dispatcher: Optional[Dispatcher] = None,
+        ttl: float = 60,
+        maxsize: int = 4096,
+    ) -> None:
+        self.book = book
+        self.dispatcher = dispatcher
+        if dispatcher is not None:
+            # a dropped fill would leave consumers' positions wrong
+            dispatcher.policies[TR_ID_EXECUTION] = POLICY.LOSSLESS
+        self.decryptor: Optional[AESCBCBase64Decryptor] = None
+        # notices for orders not in the Book yet, by the uid they apply
+        # to, with the time the first one arrived
+        self.pending: dict[str, tuple[float, list[Execution]]] = {}
+        self.ttl = ttl
+        self.maxsize = maxsize
+
+    def control(self, frame: str) -> None:
+        rdata = json.loads(frame)
+        if rdata["header"]["tr_id"] != TR_ID_EXECUTION:
+            return
+        output = rdata.get("body", {}).get("output")
+        if output:
+            self.decryptor = AESCBCBase64Decryptor(output["key"], output["iv"])
+
+    def process(self, frame: str) -> list[Execution]:
+        if self.pending:
+            self.drain()
+        if is_control(frame):
+            self.control(frame)
+            return []
+        encrypted, tr_id, count, data = split_frame(frame)
+        if tr_id != TR_ID_EXECUTION:
+            return []
+        if encrypted:
+            if self.decryptor is None:
+                logger.error("\n%s\n%s" % (tr_id, "missing key/iv"))
+                return []
+            data = self.decryptor.decrypt(data)
+        executions = list(decode_execution(data, count))
+        for execution in executions:
+            if execution.filled:
+                if not self.apply(execution):
+                    self.defer(execution.uid, execution)
+            elif execution.cancelled:
+                if not self.apply(execution):
+                    self.defer(execution.origin_uid, execution)
+            if self.dispatcher is not None:
+                self.dispatcher.publish(tr_id, execution.ticker, execution)
+        return executions
+
+    def apply(self, execution: Execution) -> bool:
+        if execution.cancelled:
+            return self.book.cancelled(execution.origin_uid)
+        return self.book.filled(execution.uid, execution.qty, execution.price)
+
+    def add(self, order: Order, inventory: Inventory) -> None:
+        # Book.add, then the notices that arrived ahead of the response
+        self.book.add(order, inventory)
+        self.flush(order.uid)
+
+    def defer(self, uid: str, execution: Execution) -> None:
+        entry = self.pending.get(uid)
+        if entry is None:
+            if len(self.pending) >= self.maxsize:
+                oldest = next(iter(self.pending))
+                logger.error(
+                    "\n%s\n%s" % (oldest, len(self.pending.pop(oldest)[1]))
+                )
+            entry = self.pending[uid] = (time.monotonic(), [])
+        entry[1].append(execution)
+
+    def flush(self, uid: str) -> bool:
+        # notices can arrive before the order response is added to the Book
+        entry = self.pending.get(uid)
+        if entry is None:
+            return True
+        executions = entry[1]
+        while executions:
+            if not self.apply(executions[0]):
+                return False
+            executions.pop(0)
+        del self.pending[uid]
+        return True
+
+    def drain(self) -> None:
+        now = time.monotonic()
+        for uid in list(self.pending):
+            if self.flush(uid):
+                continue
+            since, executions = self.pending[uid]
+            if now - since > self.ttl:
+                # never added to this Book, e.g. another process's order
+                del self.pending[uid]
+                logger.error("\n%s\n%s" % (uid, len(executions)))
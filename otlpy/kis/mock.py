@@ -0,0 +1,489 @@
+import asyncio
+import hashlib
+import json
+import random
+import string
+import time
+from typing import Any, Optional
+
+import typer
+import uvicorn
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
+
+from otlpy.base.crypto import aes_cbc_base64_enc
+from otlpy.kis import realtime
+
+URL_TOKEN = "/oauth2/tokenP"
+URL_HASHKEY = "/uapi/hashkey"
+URL_ORDER = "/uapi/domestic-stock/v1/trading/order-cash"
+URL_CANCEL_OR_REPLACE = "/uapi/domestic-stock/v1/trading/order-rvsecncl"
+URL_ALL_ORDERS = "/uapi/domestic-stock/v1/trading/inquire-daily-ccld"
+URL_LIMITORDERBOOK = (
+    "/uapi/domestic-stock/v1/quotations/inquire-asking-price-exp-ccn"
+)
+
+
+class MockConfig:
+    def __init__(
+        self,
+        latency: float = 0,
+        jitter: float = 0,
+        rate_limit: int = 0,
+        messages_per_second: float = 10,
+        records_per_frame: int = 1,
+        fill_ratio: float = 1,
+        orders: int = 0,
+        page_size: int = 100,
+        pingpong_interval: float = 10,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        # requests per second, 0 for unlimited
+        self.rate_limit = rate_limit
+        self.messages_per_second = messages_per_second
+        self.records_per_frame = records_per_frame
+        self.fill_ratio = fill_ratio
+        self.orders = orders
+        self.page_size = page_size
+        self.pingpong_interval = pingpong_interval
+
+
+def hhmmss() -> str:
+    return time.strftime("%H%M%S")
+
+
+def base_price(ticker: str) -> int:
+    return 10000 + int(hashlib.md5(ticker.encode()).hexdigest()[:4], 16) * 10
+
+
+def trade_record(ticker: str, i: int) -> str:
+    price = base_price(ticker) + i % 10 * 100
+    f = ["0"] * 46
+    f[realtime.TRADE_TICKER] = ticker
+    f[realtime.TRADE_TIMESTAMP] = hhmmss()
+    f[realtime.TRADE_PRICE] = str(price)
+    f[realtime.TRADE_QTY] = str(1 + i % 50)
+    f[realtime.TRADE_ASK] = str(price + 100)
+    f[realtime.TRADE_BID] = str(price)
+    f[realtime.TRADE_ASK_QTY] = str(1000 + i % 300)
+    f[realtime.TRADE_BID_QTY] = str(1000 + i % 700)
+    return "^".join(f)
+
+
+def orderbook_record(ticker: str, i: int) -> str:
+    price = base_price(ticker) + i % 10 * 100
+    f = ["0"] * 59
+    f[realtime.ORDERBOOK_TICKER] = ticker
+    f[realtime.ORDERBOOK_TIMESTAMP] = hhmmss()
+    for j in range(realtime.ORDERBOOK_LEVELS):
+        f[realtime.ORDERBOOK_ASK + j] = str(price + 100 + j * 100)
+        f[realtime.ORDERBOOK_BID + j] = str(price - j * 100)
+        f[realtime.ORDERBOOK_ASK_QTY + j] = str(100 + i % 7 + j)
+        f[realtime.ORDERBOOK_BID_QTY + j] = str(200 + i % 5 + j)
+    return "^".join(f)
+
+
+def execution_record(
+    row: dict[str, Any],
+    filled: float,
+    price: float,
+    correction: str = "0",
+) -> str:
+    f = [""] * 23
+    f[realtime.EXECUTION_UID] = row["odno"]
+    f[realtime.EXECUTION_ORIGIN_UID] = row["orgn_odno"]
+    f[realtime.EXECUTION_SIDE] = row["sll_buy_dvsn_cd"]
+    f[realtime.EXECUTION_CORRECTION] = correction
+    f[realtime.EXECUTION_TICKER] = row["pdno"]
+    f[realtime.EXECUTION_QTY] = str(int(filled or float(row["ord_qty"])))
+    f[realtime.EXECUTION_PRICE] = str(int(price))
+    f[realtime.EXECUTION_TIMESTAMP] = hhmmss()
+    f[realtime.EXECUTION_REFUSED] = "0"
+    f[realtime.EXECUTION_FILLED] = "2" if filled else "1"
+    f[realtime.EXECUTION_ACCEPTED] = "1" if correction == "0" else "2"
+    return "^".join(f)
+
+
+def frame(tr_id: str, records: list[str], encrypted: bool = False) -> str:
+    return "%s|%s|%03d|%s" % (
+        "1" if encrypted else "0",
+        tr_id,
+        len(records),
+        "^".join(records),
+    )
+
+
+def random_string(n: int) -> str:
+    return "".join(random.choices(string.ascii_letters + string.digits, k=n))
+
+
+class MockServer:
+    def __init__(self, config: MockConfig) -> None:
+        self.config = config
+        self.orders: list[dict[str, Any]] = []
+        self.index: dict[str, dict[str, Any]] = {}
+        self.seq = 0
+        self.second = 0
+        self.count = 0
+        self.key = random_string(32)
+        self.iv = random_string(16)
+        self.notices: set[asyncio.Queue[str]] = set()
+        for i in range(config.orders):
+            self.add_order("%06d" % (i % 100), "02", "00", 10, 10000, "")
+        self.app = FastAPI()
+        self.app.add_api_route(URL_TOKEN, self.token, methods=["POST"])
+        self.app.add_api_route(URL_HASHKEY, self.hashkey, methods=["POST"])
+        self.app.add_api_route(URL_ORDER, self.order, methods=["POST"])
+        self.app.add_api_route(
+            URL_CANCEL_OR_REPLACE, self.cancel_or_replace, methods=["POST"]
+        )
+        self.app.add_api_route(URL_ALL_ORDERS, self.all_orders)
+        self.app.add_api_route(URL_LIMITORDERBOOK, self.limitorderbook)
+        self.app.add_api_websocket_route("/", self.websocket)
+
+    async def delay(self) -> None:
+        t = self.config.latency + random.uniform(0, self.config.jitter)
+        if t > 0:
+            await asyncio.sleep(t)
+
+    def limited(self) -> bool:
+        if self.config.rate_limit <= 0:
+            return False
+        second = int(time.monotonic())
+        if second != self.second:
+            self.second = second
+            self.count = 0
+        self.count += 1
+        return self.count > self.config.rate_limit
+
+    def error(self) -> JSONResponse:
+        return JSONResponse(
+            {
+                "rt_cd": "1",
+                "msg_cd": "EGW00201",
+                "msg1": "초당 거래건수를 초과하였습니다.",
+            },
+            status_code=500,
+        )
+
+    def ok(self, output: dict[str, Any]) -> JSONResponse:
+        return JSONResponse(
+            {
+                "rt_cd": "0",
+                "msg_cd": "APBK0013",
+                "msg1": "주문 전송 완료 되었습니다.",
+                "output": output,
+            }
+        )
+
+    def add_order(
+        self,
+        ticker: str,
+        side: str,
+        otype: str,
+        qty: float,
+        price: float,
+        origin: str,
+    ) -> dict[str, Any]:
+        self.seq += 1
+        row = {
+            "ord_dt": time.strftime("%Y%m%d"),
+            "ord_gno_brno": "91252",
+            "odno": "%010d" % self.seq,
+            "orgn_odno": origin,
+            "sll_buy_dvsn_cd": side,
+            "pdno": ticker,
+            "ord_qty": str(int(qty)),
+            "ord_unpr": str(int(price)),
+            "ord_tmd": hhmmss(),
+            "tot_ccld_qty": "0",
+            "avg_prvs": "0",
+            "cncl_yn": "",
+            "tot_ccld_amt": "0",
+            "ord_dvsn_cd": otype,
+            "cncl_cfrm_qty": "0",
+            "rmn_qty": str(int(qty)),
+            "rjct_qty": "0",
+        }
+        self.orders.append(row)
+        self.index[row["odno"]] = row
+        return row
+
+    def notify(self, record: str) -> None:
+        if not self.notices:
+            return
+        message = frame(
+            realtime.TR_ID_EXECUTION,
+            [aes_cbc_base64_enc(self.key, self.iv, record)],
+            True,
+        )
+        for queue in self.notices:
+            queue.put_nowait(message)
+
+    def fill(self, row: dict[str, Any]) -> None:
+        qty = float(row["rmn_qty"])
+        price = float(row["ord_unpr"]) or base_price(row["pdno"])
+        row["tot_ccld_qty"] = row["ord_qty"]
+        row["avg_prvs"] = str(int(price))
+        row["tot_ccld_amt"] = str(int(qty * price))
+        row["rmn_qty"] = "0"
+        self.notify(execution_record(row, qty, price))
+
+    async def token(self, request: Request) -> JSONResponse:
+        await request.body()
+        await self.delay()
+        return JSONResponse(
+            {
+                "access_token": random_string(64),
+                "token_type": "Bearer",
+                "expires_in": 86400,
+            }
+        )
+
+    async def hashkey(self, request: Request) -> JSONResponse:
+        body = await request.body()
+        await self.delay()
+        if self.limited():
+            return self.error()
+        return JSONResponse({"HASH": hashlib.sha256(body).hexdigest()})
+
+    async def order(self, request: Request) -> JSONResponse:
+        data = await request.json()
+        await self.delay()
+        if self.limited():
+            return self.error()
+        if request.headers.get("tr_id") == "TTTC0802U":
+            side = "02"
+        else:
+            side = "01"
+        row = self.add_order(
+            data["PDNO"],
+            side,
+            data["ORD_DVSN"],
+            float(data["ORD_QTY"]),
+            float(data["ORD_UNPR"]),
+            "",
+        )
+        self.notify(execution_record(row, 0, 0))
+        if random.random() < self.config.fill_ratio:
+            self.fill(row)
+        return self.ok(
+            {
+                "KRX_FWDG_ORD_ORGNO": row["ord_gno_brno"],
+                "ODNO": row["odno"],
+                "ORD_TMD": row["ord_tmd"],
+            }
+        )
+
+    async def cancel_or_replace(self, request: Request) -> JSONResponse:
+        data = await request.json()
+        await self.delay()
+        if self.limited():
+            return self.error()
+        origin = self.index.get(data["ORGN_ODNO"])
+        if origin is None:
+            return JSONResponse(
+                {"rt_cd": "1", "msg_cd": "APBK0918", "msg1": "no origin"}
+            )
+        remaining = float(origin["rmn_qty"])
+        origin["rmn_qty"] = "0"
+        origin["cncl_cfrm_qty"] = str(int(remaining))
+        origin["cncl_yn"] = "Y"
+        row = self.add_order(
+            origin["pdno"],
+            origin["sll_buy_dvsn_cd"],
+            data["ORD_DVSN"],
+            remaining,
+            float(data["ORD_UNPR"]),
+            origin["odno"],
+        )
+        self.notify(
+            execution_record(
+                row, 0, 0, "2" if data["RVSE_CNCL_DVSN_CD"] == "02" else "1"
+            )
+        )
+        if data["RVSE_CNCL_DVSN_CD"] == "02":
+            row["rmn_qty"] = "0"
+            row["cncl_cfrm_qty"] = str(int(remaining))
+        elif random.random() < self.config.fill_ratio:
+            self.fill(row)
+        return self.ok(
+            {
+                "KRX_FWDG_ORD_ORGNO": row["ord_gno_brno"],
+                "ODNO": row["odno"],
+                "ORD_TMD": row["ord_tmd"],
+            }
+        )
+
+    async def all_orders(self, request: Request) -> JSONResponse:
+        await self.delay()
+        if self.limited():
+            return self.error()
+        params = request.query_params
+        odno = params.get("ODNO")
+        if odno:
+            row = self.index.get(odno)
+            return JSONResponse(
+                {
+                    "rt_cd": "0",
+                    "msg_cd": "KIOK0460",
+                    "msg1": "조회 되었습니다.",
+                    "ctx_area_fk100": "",
+                    "ctx_area_nk100": "",
+                    "output1": [] if row is None else [row],
+                    "output2": {},
+                },
+                headers={"tr_cont": "D"},
+            )
+        start = int(params.get("CTX_AREA_FK100") or 0)
+        end = start + self.config.page_size
+        if params.get("INQR_DVSN") == "01":
+            rows = self.orders[start:end]
+        else:
+            n = len(self.orders)
+            rows = self.orders[max(n - end, 0) : n - start][::-1]
+        more = end < len(self.orders)
+        return JSONResponse(
+            {
+                "rt_cd": "0",
+                "msg_cd": "KIOK0460",
+                "msg1": "조회 되었습니다.",
+                "ctx_area_fk100": str(end) if more else "",
+                "ctx_area_nk100": str(end) if more else "",
+                "output1": rows,
+                "output2": {},
+            },
+            headers={"tr_cont": "M" if more else "D"},
+        )
+
+    async def limitorderbook(self, request: Request) -> JSONResponse:
+        await self.delay()
+        if self.limited():
+            return self.error()
+        ticker = request.query_params.get("FID_INPUT_ISCD", "")
+        price = base_price(ticker)
+        output1 = {"aspr_acpt_hour": hhmmss()}
+        for j in range(realtime.ORDERBOOK_LEVELS):
+            output1["askp%d" % (j + 1)] = str(price + 100 + j * 100)
+            output1["bidp%d" % (j + 1)] = str(price - j * 100)
+            output1["askp_rsqn%d" % (j + 1)] = str(100 + j)
+            output1["bidp_rsqn%d" % (j + 1)] = str(200 + j)
+        return JSONResponse(
+            {"rt_cd": "0", "output1": output1, "output2": {}},
+            headers={"tr_cont": ""},
+        )
+
+    async def stream(
+        self, queue: asyncio.Queue[str], tr_id: str, ticker: str
+    ) -> None:
+        n = self.config.records_per_frame
+        interval = n / self.config.messages_per_second
+        record = trade_record
+        if tr_id == realtime.TR_ID_ORDERBOOK:
+            record = orderbook_record
+        i = 0
+        while True:
+            queue.put_nowait(
+                frame(tr_id, [record(ticker, i + j) for j in range(n)])
+            )
+            i += n
+            await asyncio.sleep(interval)
+
+    async def send(self, ws: WebSocket, queue: asyncio.Queue[str]) -> None:
+        while True:
+            try:
+                message = await asyncio.wait_for(
+                    queue.get(), self.config.pingpong_interval
+                )
+            except asyncio.TimeoutError:
+                message = json.dumps(
+                    {
+                        "header": {
+                            "tr_id": realtime.TR_ID_PINGPONG,
+                            "datetime": time.strftime("%Y%m%d%H%M%S"),
+                        }
+                    }
+                )
+            await ws.send_text(message)
+
+    def ack(self, tr_id: str, tr_key: str, subscribe: bool) -> str:
+        return json.dumps(
+            {
+                "header": {"tr_id": tr_id, "tr_key": tr_key, "encrypt": "N"},
+                "body": {
+                    "rt_cd": "0",
+                    "msg_cd": "OPSP0000" if subscribe else "OPSP0001",
+                    "msg1": (
+                        "SUBSCRIBE SUCCESS"
+                        if subscribe
+                        else "UNSUBSCRIBE SUCCESS"
+                    ),
+                    "output": {"iv": self.iv, "key": self.key},
+                },
+            }
+        )
+
+    async def websocket(self, ws: WebSocket) -> None:
+        await ws.accept()
+        queue: asyncio.Queue[str] = asyncio.Queue()
+        streams: dict[tuple[str, str], asyncio.Task[None]] = {}
+        sender = asyncio.create_task(self.send(ws, queue))
+        try:
+            while True:
+                message = json.loads(await ws.receive_text())
+                if message["header"].get("tr_id") == realtime.TR_ID_PINGPONG:
+                    continue
+                subscribe = message["header"]["tr_type"] == "1"
+                tr_id = message["body"]["input"]["tr_id"]
+                tr_key = message["body"]["input"]["tr_key"]
+                key = (tr_id, tr_key)
+                queue.put_nowait(self.ack(tr_id, tr_key, subscribe))
+                if tr_id == realtime.TR_ID_EXECUTION:
+                    if subscribe:
+                        self.notices.add(queue)
+                    else:
+                        self.notices.discard(queue)
+                elif subscribe and key not in streams:
+                    streams[key] = asyncio.create_task(
+                        self.stream(queue, tr_id, tr_key)
+                    )
+                elif not subscribe and key in streams:
+                    streams.pop(key).cancel()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self.notices.discard(queue)
+            for task in streams.values():
+                task.cancel()
+            sender.cancel()
+
+
+def main(
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    latency: float = 0,
+    jitter: float = 0,
+    rate_limit: int = 0,
+    messages_per_second: float = 10,
+    records_per_frame: int = 1,
+    fill_ratio: float = 1,
+    orders: int = 0,
+    log_level: Optional[str] = "warning",
+) -> None:
+    config = MockConfig(
+        latency=latency,
+        jitter=jitter,
+        rate_limit=rate_limit,
+        messages_per_second=messages_per_second,
+        records_per_frame=records_per_frame,
+        fill_ratio=fill_ratio,
+        orders=orders,
+    )
+    uvicorn.run(
+        MockServer(config).app, host=host, port=port, log_level=log_level
+    )
+
+
+if __name__ == "__main__":
+    typer.run(main)
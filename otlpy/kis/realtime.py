@@ -0,0 +1,298 @@
+from typing import Any, Iterator, Union
+
+import numpy as np
+
+from otlpy.base.dispatch import POLICY, Dispatcher
+from otlpy.base.lob import PRICE, QTY, ArrayBook, ArrayBooks
+from otlpy.base.market import ORDER_SIDE, PQN, LimitOrderBook, Price
+
+TR_ID_TRADE = "H0STCNT0"
+TR_ID_ORDERBOOK = "H0STASP0"
+TR_ID_EXECUTION = "H0STCNI0"
+TR_ID_PINGPONG = "PINGPONG"
+
+ORDERBOOK_LEVELS = 10
+
+# orderbooks are snapshots, fills must never be lost
+DISPATCH_POLICIES = {
+    TR_ID_TRADE: POLICY.DROP,
+    TR_ID_ORDERBOOK: POLICY.CONFLATE,
+    TR_ID_EXECUTION: POLICY.LOSSLESS,
+}
+
+# H0STCNT0 field offsets
+TRADE_TICKER = 0
+TRADE_TIMESTAMP = 1
+TRADE_PRICE = 2
+TRADE_ASK = 10
+TRADE_BID = 11
+TRADE_QTY = 12
+TRADE_ASK_QTY = 36
+TRADE_BID_QTY = 37
+
+# H0STASP0 field offsets
+ORDERBOOK_TICKER = 0
+ORDERBOOK_TIMESTAMP = 1
+ORDERBOOK_ASK = 3
+ORDERBOOK_BID = ORDERBOOK_ASK + ORDERBOOK_LEVELS
+ORDERBOOK_ASK_QTY = ORDERBOOK_BID + ORDERBOOK_LEVELS
+ORDERBOOK_BID_QTY = ORDERBOOK_ASK_QTY + ORDERBOOK_LEVELS
+
+# H0STCNI0 field offsets
+EXECUTION_UID = 2
+EXECUTION_ORIGIN_UID = 3
+EXECUTION_SIDE = 4
+# RCTF_CLS, 0 new, 1 replace, 2 cancel
+EXECUTION_CORRECTION = 5
+EXECUTION_TICKER = 8
+EXECUTION_QTY = 9
+EXECUTION_PRICE = 10
+EXECUTION_TIMESTAMP = 11
+EXECUTION_REFUSED = 12
+EXECUTION_FILLED = 13
+# ACPT_YN, 1 accepted, 2 confirmed, 3 refused
+EXECUTION_ACCEPTED = 14
+
+
+def is_control(frame: str) -> bool:
+    return frame[:1] == "{"
+
+
+def split_frame(frame: str) -> tuple[bool, str, int, str]:
+    encrypted, tr_id, count, data = frame.split("|", 3)
+    return encrypted == "1", tr_id, int(count), data
+
+
+def split_records(data: str, count: int) -> tuple[list[str], int]:
+    fields = data.split("^")
+    return fields, len(fields) // count
+
+
+def decode_trade(data: str, count: int) -> Iterator[Price]:
+    f, n = split_records(data, count)
+    for i in range(0, n * count, n):
+        yield Price(
+            f[i + TRADE_TIMESTAMP],
+            f[i + TRADE_TICKER],
+            PQN(float(f[i + TRADE_PRICE]), float(f[i + TRADE_QTY])),
+            PQN(float(f[i + TRADE_BID]), float(f[i + TRADE_BID_QTY])),
+            PQN(float(f[i + TRADE_ASK]), float(f[i + TRADE_ASK_QTY])),
+        )
+
+
+class Execution:
+    __slots__ = (
+        "timestamp",
+        "ticker",
+        "uid",
+        "origin_uid",
+        "oside",
+        "filled",
+        "refused",
+        "qty",
+        "price",
+        "cancelled",
+    )
+
+    def __init__(
+        self,
+        timestamp: str,
+        ticker: str,
+        uid: str,
+        origin_uid: str,
+        oside: ORDER_SIDE,
+        filled: bool,
+        refused: bool,
+        qty: float,
+        price: float,
+        cancelled: bool = False,
+    ) -> None:
+        self.timestamp = timestamp
+        self.ticker = ticker
+        self.uid = uid
+        self.origin_uid = origin_uid
+        self.oside = oside
+        self.filled = filled
+        self.refused = refused
+        self.qty = qty
+        self.price = price
+        # a confirmed cancel, its origin has no open qty left
+        self.cancelled = cancelled
+
+
+def decode_execution(data: str, count: int) -> Iterator[Execution]:
+    f, n = split_records(data, count)
+    for i in range(0, n * count, n):
+        filled = f[i + EXECUTION_FILLED] == "2"
+        refused = f[i + EXECUTION_REFUSED] != "0"
+        yield Execution(
+            f[i + EXECUTION_TIMESTAMP],
+            f[i + EXECUTION_TICKER],
+            f[i + EXECUTION_UID],
+            f[i + EXECUTION_ORIGIN_UID],
+            (
+                ORDER_SIDE.BUY
+                if f[i + EXECUTION_SIDE] == "02"
+                else ORDER_SIDE.SELL
+            ),
+            filled,
+            refused,
+            float(f[i + EXECUTION_QTY]) if filled else 0,
+            float(f[i + EXECUTION_PRICE]) if filled else 0,
+            not filled
+            and not refused
+            and f[i + EXECUTION_CORRECTION] == "2"
+            and f[i + EXECUTION_ACCEPTED] == "2",
+        )
+
+
+def decode_orderbook(data: str, count: int) -> Iterator[LimitOrderBook]:
+    f, n = split_records(data, count)
+    for i in range(0, n * count, n):
+        ask = i + ORDERBOOK_ASK
+        bid = i + ORDERBOOK_BID
+        ask_qty = i + ORDERBOOK_ASK_QTY
+        bid_qty = i + ORDERBOOK_BID_QTY
+        yield LimitOrderBook(
+            f[i + ORDERBOOK_TIMESTAMP],
+            f[i + ORDERBOOK_TICKER],
+            [
+                PQN(float(f[bid + j]), float(f[bid_qty + j]))
+                for j in range(ORDERBOOK_LEVELS)
+            ],
+            [
+                PQN(float(f[ask + j]), float(f[ask_qty + j]))
+                for j in range(ORDERBOOK_LEVELS)
+            ],
+        )
+
+
+def column(
+    f: list[str], n: int, count: int, offset: int
+) -> np.ndarray[Any, Any]:
+    return np.array(f[offset : n * count : n], dtype=np.float64)
+
+
+def block(
+    f: list[str], n: int, count: int, offset: int
+) -> np.ndarray[Any, Any]:
+    return np.array(
+        [f[i : i + ORDERBOOK_LEVELS] for i in range(offset, n * count, n)],
+        dtype=np.float64,
+    )
+
+
+def trade_columns(data: str, count: int) -> dict[str, np.ndarray[Any, Any]]:
+    f, n = split_records(data, count)
+    end = n * count
+    return {
+        "ticker": np.array(f[TRADE_TICKER:end:n]),
+        "timestamp": np.array(f[TRADE_TIMESTAMP:end:n]),
+        "price": column(f, n, count, TRADE_PRICE),
+        "qty": column(f, n, count, TRADE_QTY),
+        "bid": column(f, n, count, TRADE_BID),
+        "bid_qty": column(f, n, count, TRADE_BID_QTY),
+        "ask": column(f, n, count, TRADE_ASK),
+        "ask_qty": column(f, n, count, TRADE_ASK_QTY),
+    }
+
+
+def orderbook_columns(
+    data: str, count: int
+) -> dict[str, np.ndarray[Any, Any]]:
+    f, n = split_records(data, count)
+    end = n * count
+    return {
+        "ticker": np.array(f[ORDERBOOK_TICKER:end:n]),
+        "timestamp": np.array(f[ORDERBOOK_TIMESTAMP:end:n]),
+        "bid": block(f, n, count, ORDERBOOK_BID),
+        "bid_qty": block(f, n, count, ORDERBOOK_BID_QTY),
+        "ask": block(f, n, count, ORDERBOOK_ASK),
+        "ask_qty": block(f, n, count, ORDERBOOK_ASK_QTY),
+    }
+
+
+def decode_arraybook(data: str, count: int) -> Iterator[ArrayBook]:
+    c = orderbook_columns(data, count)
+    for i in range(count):
+        book = ArrayBook(c["timestamp"][i], c["ticker"][i])
+        book.bid[PRICE] = c["bid"][i]
+        book.bid[QTY] = c["bid_qty"][i]
+        book.ask[PRICE] = c["ask"][i]
+        book.ask[QTY] = c["ask_qty"][i]
+        yield book
+
+
+def orderbook_into(data: str, count: int, books: ArrayBooks) -> list[int]:
+    c = orderbook_columns(data, count)
+    updated = []
+    for i, ticker in enumerate(c["ticker"]):
+        if ticker in books.index:
+            updated.append(
+                books.update(
+                    c["timestamp"][i],
+                    ticker,
+                    c["bid"][i],
+                    c["bid_qty"][i],
+                    c["ask"][i],
+                    c["ask_qty"][i],
+                )
+            )
+    return updated
+
+
+def decode(frame: str) -> Iterator[Union[Price, LimitOrderBook]]:
+    if is_control(frame):
+        return
+    encrypted, tr_id, count, data = split_frame(frame)
+    if encrypted:
+        return
+    if tr_id == TR_ID_TRADE:
+        yield from decode_trade(data, count)
+    elif tr_id == TR_ID_ORDERBOOK:
+        yield from decode_orderbook(data, count)
+
+
+def new_dispatcher(maxsize: int = 1024) -> Dispatcher:
+    return Dispatcher(dict(DISPATCH_POLICIES), maxsize)
+
+
+def dispatch(frame: str, dispatcher: Dispatcher) -> int:
+    if is_control(frame):
+        return 0
+    encrypted, tr_id, count, data = split_frame(frame)
+    if encrypted or tr_id not in dispatcher.routes:
+        return 0
+    n = 0
+    if tr_id == TR_ID_TRADE:
+        for price in decode_trade(data, count):
+            n += dispatcher.publish(tr_id, price.ticker, price)
+    elif tr_id == TR_ID_ORDERBOOK:
+        for lob in decode_orderbook(data, count):
+            n += dispatcher.publish(tr_id, lob.ticker, lob)
+    return n
+
+
+def decode_columns(
+    frames: list[str],
+) -> dict[str, dict[str, np.ndarray[Any, Any]]]:
+    batches: dict[str, tuple[list[str], int]] = {}
+    for frame in frames:
+        if is_control(frame):
+            continue
+        encrypted, tr_id, count, data = split_frame(frame)
+        if encrypted:
+            continue
+        batch = batches.get(tr_id)
+        if batch is None:
+            batches[tr_id] = ([data], count)
+        else:
+            batch[0].append(data)
+            batches[tr_id] = (batch[0], batch[1] + count)
+    columns = {}
+    for tr_id, (datas, count) in batches.items():
+        if tr_id == TR_ID_TRADE:
+            columns[tr_id] = trade_columns("^".join(datas), count)
+        elif tr_id == TR_ID_ORDERBOOK:
+            columns[tr_id] = orderbook_columns("^".join(datas), count)
+    return columns
@@ -0,0 +1,242 @@
+import asyncio
+import itertools
+import json
+import os
+from typing import Any, Optional
+
+from httpx import AsyncClient
+from loguru import logger
+
+from otlpy.base.account import Book, Cancel, Inventory, Order, Replace
+from otlpy.kis.domestic_stock import DomesticStock
+
+
+def total_opened(record: dict[str, Any]) -> float:
+    return (
+        float(record["ord_qty"])
+        - float(record["tot_ccld_qty"])
+        - float(record["cncl_cfrm_qty"])
+        - float(record["rjct_qty"])
+    )
+
+
+class Reconciler:
+    def __init__(
+        self,
+        domestic_stock: DomesticStock,
+        book: Book,
+        inventories: dict[str, Inventory],
+        path: Optional[str] = None,
+        unit: float = 1,
+        cost: float = 0,
+        concurrency: int = 4,
+    ) -> None:
+        self.domestic_stock = domestic_stock
+        self.book = book
+        self.inventories = inventories
+        self.path = path
+        # inventories created for tickers only seen at the broker
+        self.unit = unit
+        self.cost = cost
+        # in-flight ODNO lookups for older open orders
+        self.concurrency = concurrency
+        # newest ODNO already reconciled on yyyymmdd
+        self.yyyymmdd = ""
+        self.odno = 0
+
+    def load(self) -> bool:
+        if self.path is None:
+            return False
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self.yyyymmdd = cached["yyyymmdd"]
+        self.odno = int(cached["odno"])
+        return True
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"yyyymmdd": self.yyyymmdd, "odno": self.odno}, f)
+        os.replace(tmp, self.path)
+
+    def inventory(self, ticker: str) -> Inventory:
+        inventory = self.inventories.get(ticker)
+        if inventory is None:
+            inventory = Inventory(ticker, self.unit, self.cost)
+            self.inventories[ticker] = inventory
+        return inventory
+
+    def order(self, record: dict[str, Any]) -> Order:
+        parsed = self.domestic_stock.parse_order(record)
+        order = parsed
+        origin, _ = self.book.get(record["orgn_odno"])
+        if origin is not None:
+            # rows don't say which, a fully confirmed cancel qty marks one
+            if float(record["cncl_cfrm_qty"]) >= parsed.qty:
+                order = Cancel(origin, parsed.otype)
+            else:
+                order = Replace(origin, parsed.otype, parsed.price)
+            order.qty = parsed.qty
+            order.rdata = parsed.rdata
+            order.uid = parsed.uid
+            order.orgno = parsed.orgno
+        # start from the submitted state, apply() brings it up to date
+        order.filled = 0
+        order.filled_price = 0
+        order.opened = order.qty
+        return order
+
+    def apply(self, record: dict[str, Any]) -> bool:
+        uid = record["odno"]
+        order, _ = self.book.get(uid)
+        if order is None:
+            order = self.order(record)
+            self.book.add(order, self.inventory(order.ticker))
+        filled = float(record["tot_ccld_qty"])
+        opened = total_opened(record)
+        if filled == order.filled and opened == order.opened:
+            return False
+        if filled < order.filled or opened > order.opened:
+            # the Book is ahead of the broker, e.g. realtime fills
+            logger.error(
+                "\n%s\n%s\n%s" % (uid, (order.filled, order.opened), record)
+            )
+            return False
+        return self.book.filled_total(
+            uid, filled, float(record["avg_prvs"]), opened
+        )
+
+    async def query(
+        self,
+        client: AsyncClient,
+        yyyymmdd: str,
+        odno: str,
+        sleep: float,
+        debug: bool,
+    ) -> list[Any]:
+        records: list[Any] = []
+        async for page, _ in self.domestic_stock.iter_all_orders(
+            client, yyyymmdd, sleep, debug, odno=odno
+        ):
+            records.extend(page)
+        return records
+
+    async def lookup(
+        self,
+        client: AsyncClient,
+        yyyymmdd: str,
+        uids: list[str],
+        sleep: float,
+        debug: bool,
+    ) -> list[Any]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def query(uid: str) -> list[Any]:
+            async with semaphore:
+                return await self.query(client, yyyymmdd, uid, sleep, debug)
+
+        records: list[Any] = []
+        for page in await asyncio.gather(*[query(uid) for uid in uids]):
+            records.extend(page)
+        return records
+
+    async def scan(
+        self,
+        client: AsyncClient,
+        yyyymmdd: str,
+        cursor: tuple[str, str],
+        uids: set[str],
+        sleep: float,
+        debug: bool,
+    ) -> list[Any]:
+        # pages older than cursor, until every one of uids is seen
+        records: list[Any] = []
+        async for page, _ in self.domestic_stock.iter_all_orders(
+            client, yyyymmdd, sleep, debug, cursor
+        ):
+            for record in page:
+                if record["odno"] in uids:
+                    uids.discard(record["odno"])
+                    records.append(record)
+            if not uids:
+                break
+        return records
+
+    def pages(self, size: int) -> int:
+        # pages below the high-water mark, from the orders the Book knows
+        older = sum(
+            1
+            for uid in itertools.chain(self.book.ois, self.book.archive)
+            if uid.isdigit() and int(uid) <= self.odno
+        )
+        return -(-older // max(size, 1))
+
+    async def reconcile(
+        self,
+        client: AsyncClient,
+        yyyymmdd: str,
+        sleep: float,
+        debug: bool,
+    ) -> int:
+        if yyyymmdd != self.yyyymmdd:
+            self.yyyymmdd = yyyymmdd
+            self.odno = 0
+        # newest first, down to the last reconciled ODNO
+        records: list[Any] = []
+        seen: set[str] = set()
+        newest = self.odno
+        complete = False
+        cursor: Optional[tuple[str, str]] = None
+        size = 0
+        async for page, cursor in self.domestic_stock.iter_all_orders(
+            client, yyyymmdd, sleep, debug
+        ):
+            complete = cursor is None
+            size = max(size, len(page))
+            done = False
+            for record in page:
+                odno = int(record["odno"])
+                newest = max(newest, odno)
+                if odno <= self.odno:
+                    done = True
+                    order, _ = self.book.get(record["odno"])
+                    if order is None or order.opened <= 0:
+                        continue
+                records.append(record)
+                seen.add(record["odno"])
+            if done:
+                complete = True
+                break
+        # older orders still open and not on the pages read above
+        stale = [
+            order.uid
+            for orders in self.book.opened.values()
+            for order in orders.values()
+            if order.uid not in seen
+            and order.uid.isdigit()
+            and int(order.uid) <= self.odno
+        ]
+        # one request each while that is fewer than paging through them
+        if cursor is not None and len(stale) > self.pages(size):
+            records.extend(
+                await self.scan(
+                    client, yyyymmdd, cursor, set(stale), sleep, debug
+                )
+            )
+        elif stale:
+            records.extend(
+                await self.lookup(client, yyyymmdd, stale, sleep, debug)
+            )
+        # oldest first so origins are in the Book before their children
+        records.sort(key=lambda r: int(r["odno"]))
+        n = sum(self.apply(record) for record in records)
+        # a failed page may hide older new orders, rescan them next time
+        if complete:
+            self.odno = newest
+            self.save()
+        return n
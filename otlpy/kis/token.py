@@ -0,0 +1,159 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Optional
+
+from httpx import AsyncClient, HTTPError
+from loguru import logger
+
+from otlpy.kis.common import Common
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+
+class FileLock:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.fd = -1
+
+    def try_acquire(self) -> bool:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if sys.platform == "win32":
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self.fd = fd
+        return True
+
+    async def acquire(self, poll: float = 0.1) -> None:
+        # polls instead of blocking a thread, so a cancelled waiter
+        # never ends up holding the lock
+        while not self.try_acquire():
+            await asyncio.sleep(poll)
+
+    def release(self) -> None:
+        if self.fd < 0:
+            return
+        if sys.platform == "win32":
+            msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        os.close(self.fd)
+        self.fd = -1
+
+
+class TokenManager:
+    def __init__(
+        self,
+        common: Common,
+        path: str,
+        margin: float = 3600,
+        backoff: float = 60,
+        backoff_max: float = 900,
+    ) -> None:
+        self.common = common
+        self.path = path
+        self.lock = FileLock(path + ".lock")
+        self.margin = margin
+        # retry delay after a failed refresh, doubled up to backoff_max
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.task: Optional[asyncio.Task[None]] = None
+
+    def fresh(self) -> bool:
+        return self.common.authorization_expires - self.margin > time.time()
+
+    def load(self) -> bool:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if cached.get("appkey") != self.common.settings.kis_app_key:
+            return False
+        self.common.authorization = cached["authorization"]
+        self.common.authorization_expires = float(cached["expires"])
+        return self.fresh()
+
+    def save(self) -> None:
+        tmp = self.path + ".tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "appkey": self.common.settings.kis_app_key,
+                    "authorization": self.common.authorization,
+                    "expires": self.common.authorization_expires,
+                },
+                f,
+            )
+        os.replace(tmp, self.path)
+
+    async def refresh(
+        self,
+        client: AsyncClient,
+        sleep: float,
+        debug: bool,
+    ) -> None:
+        await self.lock.acquire()
+        try:
+            # another process may have refreshed while we waited
+            if self.load():
+                return
+            await self.common.token(client, sleep, debug)
+            self.save()
+        finally:
+            self.lock.release()
+
+    async def ensure(
+        self,
+        client: AsyncClient,
+        sleep: float,
+        debug: bool,
+    ) -> None:
+        if not self.fresh() and not self.load():
+            await self.refresh(client, sleep, debug)
+
+    async def run(
+        self,
+        client: AsyncClient,
+        sleep: float,
+        debug: bool,
+    ) -> None:
+        backoff = self.backoff
+        while True:
+            wait = self.common.authorization_expires - self.margin
+            await asyncio.sleep(max(wait - time.time(), 1))
+            try:
+                await self.refresh(client, sleep, debug)
+            except (HTTPError, KeyError, OSError) as e:
+                logger.error("\n%s\n%s" % (self.path, e))
+                # the token endpoint is rate limited, don't hammer it
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.backoff_max)
+            else:
+                backoff = self.backoff
+
+    async def start(
+        self,
+        client: AsyncClient,
+        sleep: float,
+        debug: bool,
+    ) -> None:
+        await self.ensure(client, sleep, debug)
+        if self.task is None:
+            self.task = asyncio.create_task(self.run(client, sleep, debug))
+
+    def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
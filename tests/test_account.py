@@ -0,0 +1,71 @@
+from otlpy.base import market
+from otlpy.base.account import Book, Buy, Cancel, Inventory, Replace
+from otlpy.kis import mock
+from otlpy.kis.execution import ExecutionPipeline
+from otlpy.kis.realtime import TR_ID_EXECUTION
+
+
+def buy(book: Book, inventory: Inventory, uid: str) -> Buy:
+    order = Buy(market.ORDER_TYPE.LIMIT, "005930", 20, 70000)
+    order.uid = uid
+    order.opened = order.qty
+    book.add(order, inventory)
+    return order
+
+
+def row(uid: str, origin: str) -> dict[str, str]:
+    return {
+        "odno": uid,
+        "orgn_odno": origin,
+        "sll_buy_dvsn_cd": "02",
+        "pdno": "005930",
+        "ord_qty": "20",
+    }
+
+
+def test_cancel_closes_origin_once_confirmed() -> None:
+    book = Book()
+    inventory = Inventory("005930", 1, 0)
+    origin = buy(book, inventory, "1")
+    cancel = Cancel(origin, market.ORDER_TYPE.LIMIT)
+    cancel.uid = "2"
+    book.add(cancel, inventory)
+    assert book.open_orders("005930") == [origin]
+    assert inventory.opened_buy == 20
+    assert "2" in book.archive
+    pipeline = ExecutionPipeline(book)
+    record = mock.execution_record(row("2", "1"), 0, 0, "2")
+    pipeline.process(mock.frame(TR_ID_EXECUTION, [record]))
+    assert not book.open_orders("005930")
+    assert inventory.opened_buy == 0
+    assert sorted(book.archive) == ["1", "2"]
+
+
+def test_replace_takes_origin_open_qty() -> None:
+    book = Book()
+    inventory = Inventory("005930", 1, 0)
+    origin = buy(book, inventory, "1")
+    replace = Replace(origin, market.ORDER_TYPE.LIMIT, 69000)
+    replace.uid = "2"
+    replace.opened = origin.opened
+    book.add(replace, inventory)
+    assert book.open_orders("005930") == [replace]
+    assert inventory.opened_buy == 20
+    assert "1" in book.archive
+
+
+def test_origin_fill_during_replace_comes_off_the_child() -> None:
+    book = Book()
+    inventory = Inventory("005930", 1, 0)
+    origin = buy(book, inventory, "1")
+    replace = Replace(origin, market.ORDER_TYPE.LIMIT, 69000)
+    replace.uid = "2"
+    replace.opened = origin.opened
+    book.add(replace, inventory)
+    pipeline = ExecutionPipeline(book)
+    record = mock.execution_record(row("1", ""), 5, 70000)
+    pipeline.process(mock.frame(TR_ID_EXECUTION, [record]))
+    assert origin.filled == 5
+    assert replace.opened == 15
+    assert inventory.pos == 5
+    assert inventory.opened_buy == 15
@@ -0,0 +1,87 @@
+import asyncio
+import hashlib
+import json
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from httpx import AsyncClient, MockTransport, Request, Response
+
+from otlpy.base.account import Buy
+from otlpy.base.market import ORDER_TYPE
+from otlpy.kis.common import Common
+from otlpy.kis.domestic_stock import DomesticStock
+
+
+def output(ticker: str) -> dict[str, Any]:
+    if ticker == "000660":
+        return {"aspr_acpt_hour": "090000"}
+    rdata = {"aspr_acpt_hour": "090000"}
+    for i in range(1, 11):
+        rdata["bidp%d" % i] = "70000"
+        rdata["bidp_rsqn%d" % i] = "10"
+        rdata["askp%d" % i] = "70100"
+        rdata["askp_rsqn%d" % i] = "10"
+    return rdata
+
+
+def test_snapshot_skips_malformed_response() -> None:
+    settings = SimpleNamespace(
+        kis_account_cano_domestic_stock="00000000",
+        kis_account_prdt_domestic_stock="01",
+    )
+    ds = DomesticStock(SimpleNamespace(settings=settings))  # type: ignore
+
+    async def limitorderbook(_: Any, ticker: str, *__: Any) -> Any:
+        return output(ticker)
+
+    ds.limitorderbook = limitorderbook  # type: ignore
+    tickers = ["005930", "000660", "035420"]
+    updated: dict[str, float] = {}
+
+    async def run() -> list[str]:
+        return [
+            book.ticker
+            async for book in ds.snapshot(
+                None, tickers, 1, 0, False, updated=updated  # type: ignore
+            )
+        ]
+
+    assert asyncio.run(run()) == ["005930", "035420"]
+    assert "000660" not in updated
+
+
+def test_hashkey_is_over_the_body_sent() -> None:
+    settings = SimpleNamespace(
+        kis_app_key="key",
+        kis_app_secret="secret",
+        kis_account_cano_domestic_stock="00000000",
+        kis_account_prdt_domestic_stock="01",
+    )
+    common = Common(settings)  # type: ignore
+    common.use_hashkey = True
+    ds = DomesticStock(common)
+    sent: list[bool] = []
+
+    def handler(request: Request) -> Response:
+        digest = hashlib.sha256(request.content).hexdigest()
+        if request.url.path == "/uapi/hashkey":
+            return Response(200, json={"HASH": digest})
+        sent.append(request.headers["hashkey"] == digest)
+        output = {"ODNO": "1", "KRX_FWDG_ORD_ORGNO": "91252"}
+        return Response(200, json={"rt_cd": "0", "output": output})
+
+    async def run() -> None:
+        async with AsyncClient(
+            base_url="http://kis", transport=MockTransport(handler)
+        ) as client:
+            order = Buy(ORDER_TYPE.LIMIT, "005930", 1, 70000)
+            await ds.new_order(client, order, 0, False)
+            with pytest.raises(ValueError):
+                order = Buy(ORDER_TYPE.LIMIT, '005930","X', 1, 70000)
+                await ds.new_order(client, order, 0, False)
+
+    asyncio.run(run())
+    assert sent == [True]
+    order = Buy(ORDER_TYPE.LIMIT, "005930", 1, 70000)
+    assert json.loads(ds.order_cash_content(order))["PDNO"] == "005930"
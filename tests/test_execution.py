@@ -0,0 +1,61 @@
+from otlpy.base.account import Book, Buy, Inventory
+from otlpy.base.dispatch import Dispatcher
+from otlpy.base.market import ORDER_TYPE
+from otlpy.kis import mock
+from otlpy.kis.execution import ExecutionPipeline
+from otlpy.kis.realtime import TR_ID_EXECUTION
+
+
+def test_fills_are_never_dropped() -> None:
+    dispatcher = Dispatcher()
+    consumer = dispatcher.consumer("strategy", 1)
+    dispatcher.subscribe(consumer, TR_ID_EXECUTION)
+    pipeline = ExecutionPipeline(Book(), dispatcher)
+    row = {
+        "odno": "1",
+        "orgn_odno": "",
+        "sll_buy_dvsn_cd": "02",
+        "pdno": "005930",
+        "ord_qty": "3",
+    }
+    records = [mock.execution_record(row, 1, 70000) for _ in range(3)]
+    pipeline.process(mock.frame(TR_ID_EXECUTION, records))
+    assert consumer.metrics()["dropped"] == 0
+    assert consumer.depth() == 3
+
+
+def test_early_notices_are_applied_once_the_order_is_added() -> None:
+    book = Book()
+    pipeline = ExecutionPipeline(book)
+    row = {
+        "odno": "1",
+        "orgn_odno": "",
+        "sll_buy_dvsn_cd": "02",
+        "pdno": "005930",
+        "ord_qty": "10",
+    }
+    fill = mock.execution_record(row, 4, 70000)
+    pipeline.process(mock.frame(TR_ID_EXECUTION, [fill]))
+    assert "1" in pipeline.pending
+    order = Buy(ORDER_TYPE.LIMIT, "005930", 10, 70000)
+    order.uid = "1"
+    order.opened = order.qty
+    pipeline.add(order, Inventory("005930", 1, 0))
+    assert order.filled == 4
+    assert not pipeline.pending
+
+
+def test_unknown_notices_expire() -> None:
+    pipeline = ExecutionPipeline(Book(), ttl=0)
+    row = {
+        "odno": "2",
+        "orgn_odno": "1",
+        "sll_buy_dvsn_cd": "02",
+        "pdno": "005930",
+        "ord_qty": "10",
+    }
+    confirm = mock.execution_record(row, 0, 0, "2")
+    pipeline.process(mock.frame(TR_ID_EXECUTION, [confirm]))
+    assert "1" in pipeline.pending
+    pipeline.process('{"header":{"tr_id":"PINGPONG"}}')
+    assert not pipeline.pending
@@ -0,0 +1,21 @@
+from otlpy.base import market
+from otlpy.base.account import Buy, Inventory
+from otlpy.base.matching import MatchingEngine
+
+
+def test_trades_are_not_counted_again_as_cancels() -> None:
+    engine = MatchingEngine()
+    engine.on_book("090000", [100, 99], [100, 10], [101, 102], [10, 10])
+    order = Buy(market.ORDER_TYPE.LIMIT, "005930", 10, 100)
+    engine.submit(order, Inventory("005930", 1, 0))
+    resting = engine.resting[order.uid]
+    assert resting.ahead == 100
+    engine.on_trade("090001", 100, 50)
+    assert resting.ahead == 50
+    engine.on_book("090002", [100, 99], [50, 10], [101, 102], [10, 10])
+    assert resting.ahead == 50
+    engine.on_trade("090003", 100, 30)
+    assert order.filled == 0
+    # 30 traded, 10 cancelled out of the 20 still queued
+    engine.on_book("090004", [100, 99], [10, 10], [101, 102], [10, 10])
+    assert resting.ahead == 10
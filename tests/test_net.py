@@ -0,0 +1,82 @@
+import asyncio
+from typing import Any, Optional
+
+import pytest
+from httpx import AsyncClient, ConnectError, MockTransport, Request, Response
+
+from otlpy.base.metrics import metrics
+from otlpy.base.net import HTTPClient, get
+
+
+def test_failed_request_is_recorded() -> None:
+    def handler(request: Request) -> Response:
+        raise ConnectError("refused", request=request)
+
+    async def run() -> None:
+        async with AsyncClient(
+            base_url="http://kis", transport=MockTransport(handler)
+        ) as client:
+            await get(client, "/quotations", {"tr_id": "X"}, {}, 0, False)
+
+    metrics.reset()
+    with pytest.raises(ConnectError):
+        asyncio.run(run())
+    assert metrics.counters["X"]["exceptions"] == 1
+    assert metrics.histograms["X"].count == 1
+
+
+def test_unparsable_error_body_is_recorded() -> None:
+    def handler(_: Request) -> Response:
+        return Response(502, content=b"<html>Bad Gateway</html>")
+
+    async def run() -> None:
+        async with AsyncClient(
+            base_url="http://kis", transport=MockTransport(handler)
+        ) as client:
+            await get(client, "/quotations", {"tr_id": "X"}, {}, 0, False)
+
+    metrics.reset()
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+    assert metrics.counters["X"]["exceptions"] == 1
+    assert metrics.counters["X"]["http_errors"] == 1
+
+
+def test_resolve_follows_dns_and_clears_on_failure(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    answers: list[list[str]] = [
+        ["10.0.0.1", "10.0.0.2"],
+        ["10.0.0.2", "10.0.0.1"],
+    ]
+    answers += [["10.0.0.3"]]
+
+    def getaddrinfo(*_: Any, **__: Any) -> list[Any]:
+        if not answers:
+            raise OSError("no answer")
+        return [(2, 1, 6, "", (a, 80)) for a in answers.pop(0)]
+
+    monkeypatch.setattr("socket.getaddrinfo", getaddrinfo)
+
+    async def run() -> list[Optional[str]]:
+        client = HTTPClient("http://kis.test", 1, None)
+        resolved = [await client.resolve() for _ in range(3)]
+        with pytest.raises(OSError):
+            await client.resolve()
+        resolved.append(client.address)
+        await client.aclose()
+        return resolved
+
+    assert asyncio.run(run()) == ["10.0.0.1", "10.0.0.1", "10.0.0.3", None]
+
+
+def test_connect_error_drops_the_address() -> None:
+    async def run() -> Optional[str]:
+        client = HTTPClient("http://localhost:1", 1, None)
+        client.address = "127.0.0.1"
+        with pytest.raises(ConnectError):
+            await client.head("/")
+        await client.aclose()
+        return client.address
+
+    assert asyncio.run(run()) is None
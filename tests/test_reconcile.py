@@ -0,0 +1,100 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Optional
+
+from otlpy.base.account import Book
+from otlpy.kis.domestic_stock import DomesticStock
+from otlpy.kis.reconcile import Reconciler
+
+Cursor = Optional[tuple[str, str]]
+
+
+def record(odno: int) -> dict[str, Any]:
+    return {
+        "odno": "%010d" % odno,
+        "orgn_odno": "",
+        "ord_gno_brno": "91252",
+        "sll_buy_dvsn_cd": "02",
+        "ord_dvsn_cd": "00",
+        "pdno": "005930",
+        "ord_qty": "10",
+        "ord_unpr": "70000",
+        "tot_ccld_qty": "0",
+        "avg_prvs": "0",
+        "cncl_cfrm_qty": "0",
+        "rjct_qty": "0",
+        "rmn_qty": "10",
+    }
+
+
+def domestic_stock(fail: list[bool]) -> DomesticStock:
+    settings = SimpleNamespace(
+        kis_account_cano_domestic_stock="00000000",
+        kis_account_prdt_domestic_stock="01",
+    )
+    ds = DomesticStock(SimpleNamespace(settings=settings))  # type: ignore
+    pages = [
+        [record(i) for i in range(10, 5, -1)],
+        [record(i) for i in range(5, 0, -1)],
+    ]
+
+    async def iter_all_orders(
+        *_: Any, **__: Any
+    ) -> AsyncIterator[tuple[list[Any], Cursor]]:
+        yield pages[0], ("5", "5")
+        if fail[0]:
+            # iter_all_orders logs and stops on an error response
+            return
+        yield pages[1], None
+
+    ds.iter_all_orders = iter_all_orders  # type: ignore
+    return ds
+
+
+def test_failed_page_keeps_high_water_mark() -> None:
+    fail = [True]
+    book = Book()
+    reconciler = Reconciler(domestic_stock(fail), book, {})
+    n = asyncio.run(reconciler.reconcile(None, "20260101", 0, False))  # type: ignore
+    assert n == 0
+    assert reconciler.odno == 0
+    assert len(book.ois) == 5
+    fail[0] = False
+    asyncio.run(reconciler.reconcile(None, "20260101", 0, False))  # type: ignore
+    assert reconciler.odno == 10
+    assert sorted(book.ois) == ["%010d" % i for i in range(1, 11)]
+
+
+def test_many_stale_orders_are_paged_not_looked_up() -> None:
+    ds = domestic_stock([False])
+    rows = [record(i) for i in range(300, 0, -1)]
+    calls: list[Any] = []
+
+    async def iter_all_orders(
+        *args: Any, odno: str = "", **__: Any
+    ) -> AsyncIterator[tuple[list[Any], Cursor]]:
+        cursor = args[4] if len(args) > 4 else None
+        calls.append(odno or cursor)
+        if odno:
+            yield [r for r in rows if r["odno"] == odno], None
+            return
+        start = int(cursor[0]) if cursor else 0
+        for i in range(start, len(rows), 10):
+            more = i + 10 < len(rows)
+            yield rows[i : i + 10], (str(i + 10),) * 2 if more else None
+
+    ds.iter_all_orders = iter_all_orders  # type: ignore
+    reconciler = Reconciler(ds, Book(), {})
+    asyncio.run(reconciler.reconcile(None, "20260101", 0, False))  # type: ignore
+    assert reconciler.odno == 300
+    calls.clear()
+    rows.insert(0, record(301))
+    for r in rows[1:]:
+        r["tot_ccld_qty"] = "10"
+        r["rmn_qty"] = "0"
+    n = asyncio.run(
+        reconciler.reconcile(None, "20260101", 0, False)  # type: ignore
+    )
+    assert n == 300
+    assert not any(isinstance(c, str) and c for c in calls)
+    assert len(calls) <= 31
@@ -0,0 +1,36 @@
+from otlpy.base.account import Buy
+from otlpy.base.market import ORDER_TYPE
+from otlpy.base.risk import REJECT, RiskEngine
+
+
+def test_market_order_without_last_price_hits_notional() -> None:
+    risk = RiskEngine(["005930"], {}, max_notional=1e6)
+    order = Buy(ORDER_TYPE.MARKET, "005930", 1_000_000, 0)
+    assert risk.check(order) == REJECT.NOTIONAL
+    risk.last[0] = 0.5
+    assert risk.check(order) is None
+
+
+def test_orders_in_flight_count_against_the_limits() -> None:
+    risk = RiskEngine(["005930"], {}, max_position=10, max_notional=1e6)
+    first = Buy(ORDER_TYPE.LIMIT, "005930", 10, 70000)
+    assert risk.check(first) is None
+    # not acked yet, so not in any inventory
+    second = Buy(ORDER_TYPE.LIMIT, "005930", 1, 70000)
+    assert risk.check(second) == REJECT.POSITION
+    # a broker reject frees the reservation
+    risk.release(first)
+    assert risk.check(second) is None
+
+
+def test_open_notional_is_priced_per_order() -> None:
+    risk = RiskEngine(["005930"], {}, max_notional=1_000_000)
+    cheap = Buy(ORDER_TYPE.LIMIT, "005930", 10, 10000)
+    assert risk.check(cheap) is None
+    cheap.uid = "1"
+    cheap.opened = cheap.qty
+    risk.release(cheap)
+    # 10 * 10000 + 9 * 100000, priced at the new order it would be 1.9e6
+    dear = Buy(ORDER_TYPE.LIMIT, "005930", 9, 100000)
+    assert risk.check(dear) is None
+    assert risk.check(Buy(ORDER_TYPE.LIMIT, "005930", 1, 1)) == REJECT.NOTIONAL
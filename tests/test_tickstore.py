@@ -0,0 +1,29 @@
+import os
+
+from otlpy.base import tickstore
+from otlpy.base.market import PQN, Price
+
+
+def price(i: int) -> Price:
+    return Price(
+        "090000", "005930", PQN(70000 + i, 1), PQN(69900, 10), PQN(70100, 10)
+    )
+
+
+def test_partial_trailing_record(tmp_path: str) -> None:
+    root = str(tmp_path)
+    writer = tickstore.TickWriter(root, "20260101", tickstore.TRADE)
+    for i in range(3):
+        writer.write_price(price(i))
+    writer.close()
+    path = tickstore.segment_path(root, "20260101", tickstore.TRADE)
+    with open(path, "ab") as f:
+        f.write(b"\0" * 7)
+    reader = tickstore.TickReader(root, "20260101", tickstore.TRADE)
+    assert len(reader.records) == 3
+    writer = tickstore.TickWriter(root, "20260101", tickstore.TRADE)
+    writer.write_price(price(3))
+    writer.close()
+    assert os.path.getsize(path) % writer.buffer.itemsize == 0
+    reader = tickstore.TickReader(root, "20260101", tickstore.TRADE)
+    assert reader.records["price"].tolist() == [70000, 70001, 70002, 70003]
@@ -0,0 +1,49 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from httpx import HTTPError
+
+from otlpy.kis.token import FileLock, TokenManager
+
+
+def test_cancelled_waiter_does_not_keep_lock(tmp_path: Any) -> None:
+    path = str(tmp_path / "token.lock")
+
+    async def run() -> None:
+        holder = FileLock(path)
+        await holder.acquire()
+        waiter = FileLock(path)
+        task = asyncio.create_task(waiter.acquire(0.01))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        holder.release()
+        assert waiter.fd < 0
+        assert FileLock(path).try_acquire()
+
+    asyncio.run(run())
+
+
+def test_failed_refresh_backs_off(
+    tmp_path: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    common = SimpleNamespace(authorization_expires=0)
+    manager = TokenManager(common, str(tmp_path / "token"))  # type: ignore
+    delays: list[float] = []
+
+    async def sleep(delay: float) -> None:
+        delays.append(delay)
+        if len(delays) == 6:
+            raise asyncio.CancelledError
+
+    async def refresh(*_: Any) -> None:
+        raise HTTPError("403")
+
+    monkeypatch.setattr("asyncio.sleep", sleep)
+    monkeypatch.setattr(manager, "refresh", refresh)
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(manager.run(None, 0, False))  # type: ignore
+    assert delays == [1, 60, 1, 120, 1, 240]